@@ -2,59 +2,112 @@ import asyncio
 import uuid
 import logging
 import os
+import time
 import traceback
-from typing import List
-from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from collections import defaultdict
 
 from celery_worker.start_worker import celery_app
-from celery import signature
+from celery import chord, group
+from celery_worker.dispatch import acquire_many, release
+from celery_worker.eta import eta, video_minutes
+from celery_worker.pipelines import LOCALIZATION_STAGES, localization_pipeline
+from celery_worker.runner import runner
 from pydub import AudioSegment
 from pydub.silence import detect_nonsilent
 
 from db.dals.projects import ProjectDAL
 from db.dals.localizations import LocalizationDAL
-from db.dals.languages import LanguagesDAL
-from db.dals.users import UserDAL
 from db.models import Project, Localization, Language, User
 from db.session import async_session
+from db.unit_of_work import UnitOfWork
 from api.services import DubService, TransService, SyntService
 from api.actions.email import send_localization_done
 from core.file_processor import merge_audio_and_video, audio_from_video
-from core.storages import ProjectFiles
+from core.storages import SOURCES_PREFIX, ProjectFiles, collect_garbage
+from core.config import Config
 from core.status import StatusEnum
 
 logger = logging.getLogger("consumers")
 
 
-async def get_user_by_id(user_id: uuid.UUID) -> User:
+def run_async(coro):
+    """Runs coroutine in the event loop of the worker process"""
+    return runner.run(coro)
+
+
+def update_eta(coro):
+    """ETA bookkeeping failure is logged, it must not fail the job"""
+    try:
+        run_async(coro)
+    except Exception:
+        logger.warning(f"Unable to update ETA statistics\n{traceback.format_exc()}")
+
+
+async def start_project(
+    prj_id: uuid.UUID,
+) -> Tuple[Project, bool, Optional[Project], Optional[list]]:
+    """
+    Marks project as processing and loads it with already transcribed project
+    of the same source and its speech data, if any, in one transaction. Tells
+    whether the project is restarted after failure.
+    """
     session = async_session()
     async with session.begin():
-        user_dal = UserDAL(session)
-        res = await user_dal.get_by_id(user_id)
-    return res
-
-async def get_loc_by_id(loc_id: uuid.UUID) -> Localization:
+        project_dal = ProjectDAL(session)
+        restarted = (await project_dal.get_by_id(prj_id)).status == StatusEnum.failed
+        await project_dal.update_status(prj_id, StatusEnum.processing)
+        prj = await project_dal.get_by_id(prj_id)
+        same_prj, speech_data = None, None
+        if prj.source_hash:
+            same_prj = await project_dal.get_transcribed_by_source_hash(
+                prj.source_hash, prj.source_language_id
+            )
+        if same_prj:
+            speech_data = await project_dal.get_speech_data(same_prj.id)
+    await session.close()
+    return prj, restarted, same_prj, speech_data
+
+
+async def get_speech_data(
+    prj_id: uuid.UUID, loc_id: uuid.UUID
+) -> Tuple[Optional[list], Optional[list]]:
+    """Speech data of the project and its translation for the localization"""
     session = async_session()
     async with session.begin():
-        loc_dal = LocalizationDAL(session)
-        res = await loc_dal.get_by_id(loc_id)
-    return res
+        prj_speech_data = await ProjectDAL(session).get_speech_data(prj_id)
+        loc_speech_data = await LocalizationDAL(session).get_speech_data(loc_id)
+    await session.close()
+    return prj_speech_data, loc_speech_data
 
 
-async def get_prj_by_id(prj_id: uuid.UUID) -> Project:
+async def get_loc_speech_data(loc_id: uuid.UUID) -> Optional[list]:
     session = async_session()
     async with session.begin():
-        project_dal = ProjectDAL(session)
-        res = await project_dal.get_by_id(prj_id)
-    return res
-
-
-async def get_lang_by_id(lang_id: uuid.UUID) -> Language:
+        speech_data = await LocalizationDAL(session).get_speech_data(loc_id)
+    await session.close()
+    return speech_data
+
+
+async def start_loc_stage(
+    loc_id: uuid.UUID, task_id: str, first: bool
+) -> Tuple[Localization, Project, Language, User]:
+    """
+    Loads localization with its project, language and owner and marks it as
+    processed by the stage task in one transaction. Failed localization isn't
+    marked unless it is the first stage of the pipeline.
+    """
     session = async_session()
     async with session.begin():
-        lang_dal = LanguagesDAL(session)
-        res = await lang_dal.get_by_id(lang_id)
-    return res
+        loc_dal = LocalizationDAL(session)
+        loc, prj, lang, user = await loc_dal.get_with_context(loc_id)
+        if first:
+            await loc_dal.update(loc_id, status=StatusEnum.processing, task_id=task_id)
+            loc.status = StatusEnum.processing
+        elif loc.status != StatusEnum.failed:
+            await loc_dal.update(loc_id, task_id=task_id)
+    await session.close()
+    return loc, prj, lang, user
 
 
 async def get_prj_locs(prj_id: uuid.UUID) -> List[Localization]:
@@ -62,148 +115,299 @@ async def get_prj_locs(prj_id: uuid.UUID) -> List[Localization]:
     async with session.begin():
         loc_dal = LocalizationDAL(session)
         locs = await loc_dal.get_list_by_project_id(prj_id)
+    await session.close()
     return locs
 
 
-async def update_prj_dub(prj_id: uuid.UUID, dubs) -> bool:
+async def fail_prj_locs(prj_id: uuid.UUID) -> None:
+    """Localizations of failed project won't run, they leave the ETA backlog"""
     session = async_session()
     async with session.begin():
-        project_dal = ProjectDAL(session)
-        await project_dal.update_speech_data(prj_id, dubs)
-    return True
-
-
-async def update_prj_status(prj_id: uuid.UUID, status: StatusEnum):
-    session = async_session()
-    async with session.begin():
-        prj_dal = ProjectDAL(session)
-        await prj_dal.update_status(prj_id, status)
-    return True
-
-
-async def update_prj_task_id(prj_id: uuid.UUID, task_id: uuid.UUID):
-    session = async_session()
-    async with session.begin():
-        prj_dal = ProjectDAL(session)
-        await prj_dal.update_task_id(prj_id, task_id)
-    return True
-
-
-async def update_loc_task_id(loc_id: uuid.UUID, task_id: uuid.UUID) -> bool:
+        locs = await LocalizationDAL(session).fail_unfinished_by_project_id(prj_id)
+    await session.close()
+    await eta.dequeue_many("localization", [
+        (video_minutes(loc.duration_in_sec), loc.priority) for loc in locs
+    ])
+
+
+async def update_locs_task_ids(
+    task_ids: Dict[uuid.UUID, Optional[str]],
+    prj_id: Optional[uuid.UUID] = None,
+    prj_task_id: Optional[str] = None,
+) -> bool:
     session = async_session()
     async with session.begin():
         loc_dal = LocalizationDAL(session)
-        await loc_dal.update_task_id(loc_id, task_id)
+        await loc_dal.update_task_ids(task_ids)
+        if prj_id is not None:
+            await ProjectDAL(session).update_task_id(prj_id, prj_task_id)
+    await session.close()
     return True
 
 
-async def update_loc_result_name(loc_id: uuid.UUID, result_name: str) -> bool:
+async def get_referenced_files() -> Dict[str, Set[str]]:
+    """
+    Names of files referenced by projects and localizations by project id,
+    ids of localizations whose checkpoints are kept for restart and hashes
+    of referenced sources
+    """
     session = async_session()
     async with session.begin():
-        loc_dal = LocalizationDAL(session)
-        await loc_dal.update_result_path(loc_id, result_name)
-    return True
-
-
-async def update_loc_dub(loc_id: uuid.UUID, dubs) -> bool:
+        prj_files = await ProjectDAL(session).get_file_names()
+        loc_files = await LocalizationDAL(session).get_result_names()
+        loc_ids = await LocalizationDAL(session).get_unfinished_ids()
+    await session.close()
+
+    referenced = defaultdict(set)
+    for prj_id, source_name, preview_name, source_hash in prj_files:
+        referenced[str(prj_id)].update((source_name, preview_name))
+        referenced[SOURCES_PREFIX].add(source_hash)
+    for prj_id, result_name in loc_files:
+        referenced[str(prj_id)].add(result_name)
+    for prj_id, loc_id in loc_ids:
+        referenced[str(prj_id)].add(str(loc_id))
+    return referenced
+
+
+@celery_app.task(name="collect_garbage")
+def collect_garbage_task():
+    referenced = run_async(get_referenced_files())
+    reclaimed = collect_garbage(referenced, Config.GC_FILE_MAX_AGE_SEC)
+    logger.info(f"Collected garbage, {reclaimed} bytes reclaimed")
+    return reclaimed
+
+
+def worker_capacity() -> Dict[str, int]:
+    """Total pool size of online workers consuming each queue"""
+    inspect = celery_app.control.inspect(timeout=1)
+    stats = inspect.stats() or {}
+    capacity = defaultdict(int)
+    for worker, queues in (inspect.active_queues() or {}).items():
+        concurrency = stats.get(worker, {}).get("pool", {}).get("max-concurrency", 1)
+        for queue in queues:
+            capacity[queue["name"]] += concurrency
+    return capacity
+
+
+@celery_app.task(name="refresh_capacity", ignore_result=True)
+def refresh_capacity():
+    run_async(eta.set_capacity(worker_capacity()))
+
+
+async def get_backlog() -> Tuple[Dict[int, int], Dict[int, int]]:
     session = async_session()
     async with session.begin():
-        loc_dal = LocalizationDAL(session)
-        await loc_dal.update_speech_data(loc_id, dubs)
-    return True
+        prj_backlog = await ProjectDAL(session).get_backlog_minutes()
+        loc_backlog = await LocalizationDAL(session).get_backlog_minutes()
+    await session.close()
+    return prj_backlog, loc_backlog
 
 
-async def update_loc_status(loc_id: uuid.UUID, status: StatusEnum):
-    session = async_session()
-    async with session.begin():
-        loc_dal = LocalizationDAL(session)
-        await loc_dal.update_status(loc_id, status)
-    return True
+@celery_app.task(name="reconcile_backlog", ignore_result=True)
+def reconcile_backlog():
+    prj_backlog, loc_backlog = run_async(get_backlog())
+    run_async(eta.reset_backlog("project", prj_backlog))
+    run_async(eta.reset_backlog("localization", loc_backlog))
 
 
 @celery_app.task(name="process_video", ignore_result=True)
 def process_video(prj_id):
-    prj_status = StatusEnum.processing
-    loop = asyncio.get_event_loop()
+    """
+    Transcribes project source and dispatches pipelines of its localizations
+    as one chord. Project keeps id of the chord callback as its task id until
+    all of them are finished, every localization is tracked by its own task
+    id and dispatch lock.
+    """
+    prj = None
+    failed = False
+    uow = UnitOfWork()
     try:
         logger.info(f"Start processing Project({prj_id})")
-        loop.run_until_complete(update_prj_status(prj_id, prj_status))
-
-        prj = loop.run_until_complete(get_prj_by_id(prj_id))
-        prj_files = ProjectFiles(prj.id)
-        wav_path = prj_files.get_file_path(f"{uuid.uuid4()}.wav", checks=False)
-        audio_from_video(prj_files.get_file_path(prj.source_name), wav_path)
-        dub_task_id = DubService.push(wav_path)
-        prj_files.delete_file(os.path.basename(wav_path))
-        dubs = DubService.await_result(dub_task_id)
-        loop.run_until_complete(update_prj_dub(prj_id, dubs))
-
-        locs = loop.run_until_complete(get_prj_locs(prj_id))
-        for loc in locs:
-            task = signature("process_subs", args=(loc.id,)).delay()
-            loop.run_until_complete(update_loc_task_id(loc.id, task.id))
-
-        prj_status = StatusEnum.processed
+        prj, restarted, same_prj, same_dubs = run_async(start_project(prj_id))
+
+        if same_prj:
+            logger.info(f"Project({prj_id}) reuses speech data of Project({same_prj.id})")
+            dubs = same_dubs
+        else:
+            prj_files = ProjectFiles(prj.id)
+            wav_path = prj_files.get_file_path(f"{uuid.uuid4()}.wav", checks=False)
+            started = time.monotonic()
+            audio_from_video(prj_files.get_file_path(prj.source_name), wav_path)
+            try:
+                dubs = run_async(DubService.atranscribe(wav_path))
+            finally:
+                prj_files.delete_file(os.path.basename(wav_path))
+            update_eta(eta.record(
+                "transcribe", video_minutes(prj.duration_in_sec), time.monotonic() - started
+            ))
+
+        uow.update_project_speech_data(prj_id, dubs)
+        uow.update_project(prj_id, status=StatusEnum.processed, task_id=None)
+        run_async(uow.commit())
+
+        # localization restarted meanwhile holds its dispatch lock and isn't
+        # sent twice, the rest are sent as one chord
+        locs = {loc.id: loc for loc in run_async(get_prj_locs(prj_id))}
+        pipelines = {loc.id: localization_pipeline(loc.id, loc.priority) for loc in locs.values()}
+        task_ids = run_async(acquire_many(
+            "localization", {loc_id: p.freeze().id for loc_id, p in pipelines.items()}
+        ))
+        if task_ids:
+            # ids are written before the chord is sent, its callback can't
+            # run ahead of them
+            finish = finish_project.si(prj_id)
+            run_async(update_locs_task_ids(task_ids, prj_id, finish.freeze().id))
+            try:
+                chord(group(pipelines[loc_id] for loc_id in task_ids), finish).apply_async()
+            except Exception:
+                run_async(update_locs_task_ids(dict.fromkeys(task_ids)))
+                run_async(release("localization", *task_ids))
+                raise
+            # localizations failed with the project on previous run or
+            # created after it are back
+            update_eta(eta.enqueue_many("localization", [
+                (video_minutes(locs[loc_id].duration_in_sec), locs[loc_id].priority)
+                for loc_id in task_ids
+                if locs[loc_id].status == StatusEnum.failed
+                or (restarted and locs[loc_id].status == StatusEnum.created)
+            ]))
+
         logger.info(f"Project({prj_id}) source successfully processed")
     except Exception as e:
-        prj_status = StatusEnum.failed
+        uow.update_project(prj_id, status=StatusEnum.failed, task_id=None)
+        failed = True
         logger.error(f"Error while processing project({prj_id})" + "\n" + traceback.format_exc())
     finally:
-        loop.run_until_complete(update_prj_status(prj_id, prj_status))
-        loop.run_until_complete(update_prj_task_id(prj_id, None))
-
-
-
-@celery_app.task(name="process_subs", ignore_result=True)
-def process_subs(loc_id):
-    loc_status = StatusEnum.processing
-    loop = asyncio.get_event_loop()
+        run_async(uow.commit())
+        if failed:
+            update_eta(fail_prj_locs(prj_id))
+        if prj is not None:
+            update_eta(eta.dequeue("project", video_minutes(prj.duration_in_sec), prj.priority))
+        run_async(release("project", prj_id))
+
+
+@celery_app.task(name="finish_project", ignore_result=True)
+def finish_project(prj_id):
+    """Chord callback, runs when pipelines of all localizations are finished"""
+    uow = UnitOfWork()
+    uow.update_project(prj_id, task_id=None)
+    run_async(uow.commit())
+    logger.info(f"Project({prj_id}) localizations are finished")
+
+
+def run_loc_stage(task, loc_id: uuid.UUID, stage: Callable, first: bool = False):
+    """
+    Runs one stage of localization pipeline. Stage failure marks localization
+    as failed, following stages of the chain are skipped then. Updates made by
+    the stage are written in one transaction when it ends. Stage returns False
+    if its work has been done before, otherwise its duration is recorded.
+    """
+    stage_name = LOCALIZATION_STAGES[task.name]
+    finished = False
+    loc = None
+    uow = UnitOfWork()
     try:
-        logger.info(f"Start processing Localization({loc_id})")
-        loop.run_until_complete(update_loc_status(loc_id, loc_status))
-
-        loc = loop.run_until_complete(get_loc_by_id(loc_id))
-        prj = loop.run_until_complete(get_prj_by_id(loc.project_id))
-
-        lang = loop.run_until_complete(get_lang_by_id(loc.target_language_id))
-
-        prj_files = ProjectFiles(prj.id)
-        reformer = SRT_reformer()
-        for item in prj.parsed_speech_data:
-            reformer.add_fragment(SRT_fragment(item["start"], item["end"], item["text"]))
-
-        translated_dubs = reformer.translate(lang.api_name)
-        reformer.synthesize(prj_files, loc.target_voice_name)
-        audio_name = reformer.combine(prj_files)
-
-        
-        result_path = prj_files.get_file_path(
-            str(uuid.uuid4()) + os.path.splitext(prj.source_name)[1],
-            checks=False
-        )
-        merge_audio_and_video(
-            prj_files.get_file_path(prj.source_name),
-            prj_files.get_file_path(audio_name),
-            result_path
-        )
-        loop.run_until_complete(update_loc_dub(loc_id, translated_dubs))
-        loop.run_until_complete(update_loc_result_name(loc_id, os.path.basename(result_path)))
-        loc_status = StatusEnum.processed
-
-        logger.info(f"Localization({loc_id}) source successfully processed")
+        loc, prj, lang, user = run_async(start_loc_stage(loc_id, task.request.id, first))
+        if loc.status == StatusEnum.failed:
+            return
+        if first:
+            logger.info(f"Start processing Localization({loc_id})")
+        started = time.monotonic()
+        if stage(uow, loc, prj, lang, user, ProjectFiles(prj.id)) is not False:
+            update_eta(eta.record(
+                stage_name, video_minutes(loc.duration_in_sec), time.monotonic() - started
+            ))
+        finished = task.name == list(LOCALIZATION_STAGES)[-1]
     except Exception as e:
-        loc_status = StatusEnum.failed
         logger.error(f"Error while processing localization({loc_id})\n{traceback.format_exc()}")
+        uow.update_localization(loc_id, status=StatusEnum.failed, task_id=None)
+        finished = loc is not None
     finally:
-        loop.run_until_complete(update_loc_status(loc_id, loc_status))
-        loop.run_until_complete(update_loc_task_id(loc_id, None))
-        if loc_status == StatusEnum.processed:
-            loc = loop.run_until_complete(get_loc_by_id(loc_id))
-            user = loop.run_until_complete(get_user_by_id(prj.user_id))
-            loop.run_until_complete(send_localization_done(user, lang, loc, prj))
+        run_async(uow.commit())
+        if finished:
+            update_eta(eta.dequeue(
+                "localization", video_minutes(loc.duration_in_sec), loc.priority
+            ))
+            run_async(release("localization", loc_id))
+
+
+def translate_stage(uow, loc, prj, lang, user, prj_files: ProjectFiles):
+    prj_speech_data, loc_speech_data = run_async(get_speech_data(prj.id, loc.id))
+    if loc_speech_data:
+        logger.info(f"Localization({loc.id}) is already translated")
+        return False
+    reformer = SRT_reformer(loc.id, prj_speech_data)
+    translated_dubs = run_async(reformer.translate(lang.api_name))
+    uow.update_localization_speech_data(loc.id, translated_dubs)
+
+
+def synthesize_stage(uow, loc, prj, lang, user, prj_files: ProjectFiles):
+    reformer = SRT_reformer(loc.id, run_async(get_loc_speech_data(loc.id)))
+    run_async(reformer.synthesize(prj_files, loc.target_voice_name))
+
+
+def mix_stage(uow, loc, prj, lang, user, prj_files: ProjectFiles):
+    reformer = SRT_reformer(loc.id, run_async(get_loc_speech_data(loc.id)))
+    if prj_files.has_file(reformer.result_name):
+        logger.info(f"Localization({loc.id}) audio is already mixed")
+        return False
+    prj_files.commit(reformer.combine(prj_files))
+
+
+def merge_stage(uow, loc, prj, lang, user, prj_files: ProjectFiles):
+    reformer = SRT_reformer(loc.id, run_async(get_loc_speech_data(loc.id)))
+    result_path = prj_files.get_file_path(
+        str(uuid.uuid4()) + os.path.splitext(prj.source_name)[1],
+        checks=False
+    )
+    merge_audio_and_video(
+        prj_files.get_file_path(prj.source_name),
+        prj_files.get_file_path(reformer.result_name),
+        result_path
+    )
+    prj_files.commit(os.path.basename(result_path))
+    loc.result_name = os.path.basename(result_path)
+    uow.update_localization(
+        loc.id,
+        result_name=loc.result_name,
+        status=StatusEnum.processed,
+        task_id=None,
+    )
+    run_async(uow.commit())
+    logger.info(f"Localization({loc.id}) source successfully processed")
+
+    try:
         reformer.cleanup(prj_files)
+        run_async(send_localization_done(user, lang, loc, prj))
+    except Exception as e:
+        logger.error(f"Error while finishing localization({loc.id})\n{traceback.format_exc()}")
 
 
+# messages queued by previous versions, remove in next release
+@celery_app.task(name="process_subs", ignore_result=True)
+def process_subs(loc_id):
+    localization_pipeline(loc_id).apply_async()
+
+
+@celery_app.task(name="translate_subs", bind=True)
+def translate_subs(self, loc_id):
+    run_loc_stage(self, loc_id, translate_stage, first=True)
+
+
+@celery_app.task(name="synthesize_subs", bind=True)
+def synthesize_subs(self, loc_id):
+    run_loc_stage(self, loc_id, synthesize_stage)
+
+
+@celery_app.task(name="mix_subs", bind=True)
+def mix_subs(self, loc_id):
+    run_loc_stage(self, loc_id, mix_stage)
+
+
+@celery_app.task(name="merge_subs", bind=True)
+def merge_subs(self, loc_id):
+    run_loc_stage(self, loc_id, merge_stage)
+
 
 class SRT_fragment:
     def __init__(self, start_time, end_time, text):
@@ -214,11 +418,13 @@ class SRT_fragment:
 
 
 class SRT_reformer:
-    frag_temp_name = "frag_{}.mp3"
-    result_name = "result.wav"
-
-    def __init__(self):
-        self.srt_array: List[SRT_fragment] = []
+    def __init__(self, loc_id: uuid.UUID, speech_data):
+        self.frag_temp_name = f"frag_{loc_id}_{{}}.mp3"
+        self.result_name = f"mix_{loc_id}.wav"
+        self.srt_array: List[SRT_fragment] = [
+            SRT_fragment(item["start"], item["end"], item["text"])
+            for item in speech_data
+        ]
 
     def _strip_silence(self, audio_segment, silence_thresh=-50, chunk_size=10):
         nonsilent_chunks = detect_nonsilent(audio_segment, min_silence_len=chunk_size, silence_thresh=silence_thresh)
@@ -235,11 +441,14 @@ class SRT_reformer:
         for i in range(len(self.srt_array)):
             prj_files.delete_file(self.frag_temp_name.format(i))
 
-    def translate(self, target_lang: str):
+    async def translate(self, target_lang: str):
+        texts = await asyncio.gather(*(
+            TransService.atranslate(fragment.text, target_lang)
+            for fragment in self.srt_array
+        ))
         result = []
-        for fragment in self.srt_array:
-            task_id = TransService.push(fragment.text, target_lang)
-            fragment.text = TransService.await_result(task_id)
+        for fragment, text in zip(self.srt_array, texts):
+            fragment.text = text
             result.append({
                 "text": fragment.text,
                 "start": fragment.start_time,
@@ -247,10 +456,17 @@ class SRT_reformer:
             })
         return result
 
-    def synthesize(self, prj_files: ProjectFiles, target_voice_name: str):
-        for i, item in enumerate(self.srt_array):
-            bytes = SyntService.synt(item.text, target_voice_name)
-            prj_files.store_by_bytes(bytes, self.frag_temp_name.format(i))
+    async def synthesize(self, prj_files: ProjectFiles, target_voice_name: str):
+        async def synthesize_fragment(name: str, text: str):
+            if await asyncio.to_thread(prj_files.has_file, name):
+                return
+            bytes = await SyntService.asynt(text, target_voice_name)
+            await asyncio.to_thread(prj_files.store_by_bytes, bytes, name)
+
+        await asyncio.gather(*(
+            synthesize_fragment(self.frag_temp_name.format(i), item.text)
+            for i, item in enumerate(self.srt_array)
+        ))
 
     def combine(self, prj_files: ProjectFiles):
         first_start = int(self.srt_array[0].start_time * 1000)
@@ -274,6 +490,14 @@ class SRT_reformer:
         for item in self.srt_array:
             result += item.audio
 
-        result.export(prj_files.get_file_path(self.result_name, checks=False), format='wav')
+        # mixed result is a checkpoint, it must appear complete or not at all
+        result_path = prj_files.get_file_path(self.result_name, checks=False)
+        tmp_path = f"{result_path}.{uuid.uuid4()}.part"
+        try:
+            result.export(tmp_path, format='wav')
+            os.replace(tmp_path, result_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
         return self.result_name
 
@@ -1,91 +1,193 @@
 import uuid
+import base64
 import logging
+from datetime import datetime
+from typing import Collection, List, Optional, Sequence, Tuple
 
-from celery.result import AsyncResult
-from fastapi import Depends, status
+from celery import current_app
+from fastapi import Depends, Query, Request, status
 from fastapi.responses import JSONResponse
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.actions.users import get_current_user
-from api.exceptions import ownership_exception
+from api.exceptions import ownership_exception, credentials_exception, incorrectCursor_exception
+from core.security import decode_token, optional_oauth2_scheme
 from db.session import get_db
 from api import pydantic_models as models
 from db.dals.projects import ProjectDAL
 from db.dals.localizations import LocalizationDAL
+from db.dals.users import UserDAL
+from db.models import Project, Localization
+from celery_worker.dispatch import release
+from celery_worker.eta import eta, video_minutes
+from core.status import StatusEnum
 from core.storages import ProjectFiles
 
 
-async def delete_user_projects(session: AsyncResult, user_id: uuid.UUID) -> bool:
-    async with session.begin():
-        project_dal = ProjectDAL(session)
-        projects = await project_dal.get_list_by_user_id(user_id)
-
-    for project in projects:
-        await delete_project(session, project.id)
-
-    return True
+def encode_cursor(created: datetime, prj_id: uuid.UUID) -> str:
+    return base64.urlsafe_b64encode(f"{created.isoformat()}|{prj_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        created, prj_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created), uuid.UUID(prj_id)
+    except ValueError:
+        raise incorrectCursor_exception
+
+
+async def forget_jobs(
+    kind: str, jobs: Sequence, failed_prj_ids: Collection[uuid.UUID] = ()
+) -> None:
+    """
+    Revokes tasks of deleted jobs with one broadcast, releases their dispatch
+    locks and removes not finished ones from the ETA backlog. Localizations
+    of failed projects are not in the backlog.
+    """
+    task_ids = [job.task_id for job in jobs if job.task_id]
+    if task_ids:
+        current_app.control.revoke(task_ids, terminate=True)
+    await release(kind, *(job.id for job in jobs))
+    await eta.dequeue_many(kind, [
+        (video_minutes(job.duration_in_sec), job.priority)
+        for job in jobs
+        if job.status in (StatusEnum.created, StatusEnum.processing)
+        and (kind != "localization" or job.project_id not in failed_prj_ids)
+    ])
+
+
+def delete_projects_files(prj_ids: Sequence[uuid.UUID]) -> None:
+    """Blocking, is meant to be run as a background task"""
+    for prj_id in prj_ids:
+        ProjectFiles(prj_id).delete_files()
 
 
-async def delete_project(session: AsyncSession, prj_id: uuid.UUID) -> bool:
+async def delete_user_projects(session: AsyncSession, user_id: uuid.UUID) -> List[uuid.UUID]:
+    """
+    Deletes all user's projects and their localizations in one transaction.
+    Returns ids of deleted projects, their files are left to the caller.
+    """
     async with session.begin():
-        localization_dal = LocalizationDAL(session)
-        localizations = await localization_dal.get_list_by_project_id(prj_id)
+        project_ids = select(Project.id).where(Project.user_id == user_id)
+        localizations = await LocalizationDAL(session).delete_by_project_ids(project_ids)
+        projects = await ProjectDAL(session).delete_by_user_id(user_id)
+
+    await forget_jobs("localization", localizations, {
+        project.id for project in projects if project.status == StatusEnum.failed
+    })
+    await forget_jobs("project", projects)
+    return [project.id for project in projects]
 
-    for loc in localizations:
-        await delete_localization(session, loc.id)
 
+async def delete_project(
+    session: AsyncSession, prj_id: uuid.UUID, project: Optional[Project] = None
+) -> bool:
+    """Deletes project with its localizations, files are left to the caller"""
     async with session.begin():
         project_dal = ProjectDAL(session)
-        project = await project_dal.get_by_id(prj_id)
-        if project.task_id:
-            AsyncResult(project.task_id).revoke(terminate=True)
-        ProjectFiles(prj_id).delete_files()
+        if project is None:
+            project = await project_dal.get_by_id(prj_id)
+        localizations = await LocalizationDAL(session).delete_by_project_ids([prj_id])
         await project_dal.delete(prj_id)
 
+    await forget_jobs("localization", localizations, (
+        {project.id} if project.status == StatusEnum.failed else ()
+    ))
+    await forget_jobs("project", [project])
     return True
 
 
-async def delete_localization(session: AsyncSession, loc_id: uuid.UUID) -> bool:
+async def delete_localization(
+    session: AsyncSession,
+    loc_id: uuid.UUID,
+    localization: Optional[Localization] = None,
+    project: Optional[Project] = None,
+) -> bool:
     async with session.begin():
         localization_dal = LocalizationDAL(session)
-        localization = await localization_dal.get_by_id(loc_id)
-
-        if localization.task_id:
-            AsyncResult(localization.task_id).revoke(terminate=True)
-        if localization.result_name:
-            ProjectFiles(localization.project_id).delete_file(localization.result_name)
+        if localization is None:
+            localization = await localization_dal.get_by_id(loc_id)
+        if project is None:
+            project = await ProjectDAL(session).get_by_id(localization.project_id)
         await localization_dal.delete_by_id(localization.id)
 
+    await forget_jobs("localization", [localization], (
+        {project.id} if project.status == StatusEnum.failed else ()
+    ))
+    if localization.result_name:
+        ProjectFiles(localization.project_id).delete_file(localization.result_name)
     return True
 
 
 async def check_project_ownership(
+    request: Request,
     body: models.ProjectID = Depends(),
     current_user: models.UserInfo = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
+    """Loaded project is passed to the handler as request.state.project"""
     async with db.begin():
-        project_dal = ProjectDAL(db)
-        if not await project_dal.belongs_to_user(body.prj_id, current_user.id):
-            # todo: raise error instead
+        project = await ProjectDAL(db).get_owned(body.prj_id, current_user.id)
+        if project is None:
             raise ownership_exception
 
+    request.state.project = project
     return body
 
 
 async def check_localization_ownership(
+    request: Request,
     body: models.LocalizationID = Depends(),
     current_user: models.UserInfo = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
+    """
+    Loaded localization and its project are passed to the handler as
+    request.state.localization and request.state.project
+    """
     async with db.begin():
-        localization = await LocalizationDAL(db).get_by_id(body.loc_id)
-        if localization.project_id != body.prj_id:
-            # todo: raise error instead
+        owned = await LocalizationDAL(db).get_owned(
+            body.loc_id, body.prj_id, current_user.id
+        )
+        if owned is None:
             raise ownership_exception
-        project = await ProjectDAL(db).get_by_id(localization.project_id)
-        if project.user_id != current_user.id:
-            # todo: raise error instead
+
+    request.state.localization, request.state.project = owned
+    return body
+
+
+async def check_media_access(
+    body: models.ProjectID = Depends(),
+    token: Optional[str] = Query(None),
+    bearer: Optional[str] = Depends(optional_oauth2_scheme),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Media can be requested with media or share token of the project in 'token'
+    query parameter (links made by get_file_link carry one), or by project
+    owner with access token in Authorization header. Access token is never
+    taken from the query, so it doesn't leak to logs and Referer.
+    """
+    if token:
+        payload = decode_token(token)
+        if payload["aim"] not in ("media", "share"):
+            raise credentials_exception
+        if payload.get("prj_id") != str(body.prj_id):
+            raise ownership_exception
+        return body
+
+    if not bearer:
+        raise credentials_exception
+    payload = decode_token(bearer)
+    if payload["aim"] != "login" or payload.get("email") is None:
+        raise credentials_exception
+
+    async with db.begin():
+        user = await UserDAL(db).get_by_email(payload["email"])
+        if user is None:
+            raise credentials_exception
+        if not await ProjectDAL(db).belongs_to_user(body.prj_id, user.id):
             raise ownership_exception
 
     return body
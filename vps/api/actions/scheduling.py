@@ -0,0 +1,29 @@
+import uuid
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import Config
+from db.dals.localizations import LocalizationDAL
+from db.dals.projects import ProjectDAL
+from db.dals.subscriptions import SubscriptionDAL
+
+# Redis broker treats 0 as the highest priority
+MAX_PRIORITY = 9
+
+
+def job_priority(subscribed: bool, in_flight: int) -> int:
+    """
+    Priority of the next user job. Tier gives the base priority, every
+    FAIR_SHARE_STEP unfinished jobs of the user lower it by one level, so
+    a user with a long backlog doesn't starve the others.
+    """
+    base = Config.SUBSCRIBER_PRIORITY if subscribed else Config.DEFAULT_PRIORITY
+    return min(base + in_flight // Config.FAIR_SHARE_STEP, MAX_PRIORITY)
+
+
+async def get_user_priority(session: AsyncSession, user_id: uuid.UUID) -> int:
+    user_sub = await SubscriptionDAL(session).get_user_sub(user_id)
+    in_flight = await ProjectDAL(session).count_in_flight_by_user(
+        user_id
+    ) + await LocalizationDAL(session).count_in_flight_by_user(user_id)
+    return job_priority(bool(user_sub), in_flight)
@@ -16,9 +16,11 @@ from core.security import (
     oauth2_scheme
 )
 
+from core.auth_cache import AuthCache
 from core.config import Config
 from db.dals.users import UserDAL
 from db.dals.subscriptions import SubscriptionDAL
+from core.redis import redis_client
 from db.session import get_db
 
 sso_google = GoogleSSO(
@@ -27,6 +29,13 @@ sso_google = GoogleSSO(
     redirect_uri=Config.DOMAIN_URL + "users/google_callback",
 )
 
+auth_cache = AuthCache(
+    models.UserInfo,
+    ttl=Config.AUTH_CACHE_TTL_SEC,
+    max_size=Config.AUTH_CACHE_SIZE,
+    client=redis_client if Config.AUTH_CACHE_REDIS else None,
+)
+
 
 async def create_new_user(
     body: models.UserRegister, session: AsyncSession, from_sso: bool = False
@@ -62,6 +71,10 @@ async def get_current_user(
     if aim != "login":
         raise credentials_exception
 
+    user_info = await auth_cache.get(token, email)
+    if user_info is not None:
+        return user_info
+
     async with session.begin():
         user_dal = UserDAL(session)
         user = await user_dal.get_by_email(email)
@@ -80,6 +93,7 @@ async def get_current_user(
 
         user_info = models.UserInfo.parse_obj(user_dict)
 
+    await auth_cache.set(token, email, user_info)
     return user_info
 
 
@@ -83,4 +83,9 @@ notEnoughFunds_exception = HTTPException(
 bigVideo_exception = HTTPException(
     status_code=status.HTTP_400_BAD_REQUEST,
     detail="Video exceed maximum duration!",
-)
\ No newline at end of file
+)
+
+incorrectCursor_exception = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Incorrect page cursor",
+)
@@ -57,7 +57,7 @@ class ProjectInfo(BaseModel):
 
     @model_validator(mode="before")
     def _transform(cls, values):
-        if values is not dict:
+        if not isinstance(values, dict):
             if not hasattr(values, "__dict__"):
                 raise ValueError('Input is not a dict or don`t have __dict__ attribute')
             values = values.__dict__
@@ -69,6 +69,7 @@ class ProjectInfo(BaseModel):
 
 class ProjectsList(BaseModel):
     projects: List[ProjectInfo]
+    next_cursor: Optional[str] = None
 
 
 class ProjectCreate(BaseModel):
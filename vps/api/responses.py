@@ -0,0 +1,69 @@
+from typing import Union
+
+import anyio
+from starlette.concurrency import iterate_in_threadpool
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from core.storages import ProjectFiles
+
+
+class MediaResponse(Response):
+    """
+    Streams bytes [start, end] of the project file. Stored on local disk file
+    is handed to the server via 'http.response.zerocopy' ASGI extension
+    (sendfile) when it's supported, otherwise it is streamed by chunks.
+    """
+
+    def __init__(
+        self,
+        files: ProjectFiles,
+        file_name: str,
+        start: int,
+        end: int,
+        status_code: int = 200,
+        headers: Union[dict, None] = None,
+        media_type: Union[str, None] = None,
+        send_body: bool = True,
+    ):
+        self.files = files
+        self.file_name = file_name
+        self.start = start
+        self.end = end
+        self.status_code = status_code
+        self.media_type = media_type
+        self.send_body = send_body
+        self.background = None
+        self.init_headers(headers)
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        if not self.send_body or self.end < self.start:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        path = self.files.get_stored_path(self.file_name)
+        if path and "http.response.zerocopy" in scope.get("extensions", {}):
+            async with await anyio.open_file(path, "rb") as f:
+                await send(
+                    {
+                        "type": "http.response.zerocopy",
+                        "file": f.wrapped.fileno(),
+                        "offset": self.start,
+                        "count": self.end - self.start + 1,
+                        "more_body": False,
+                    }
+                )
+            return
+
+        chunks = self.files.stream_file(self.file_name, self.start, self.end)
+        async for chunk in iterate_in_threadpool(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -2,4 +2,5 @@ from .projects import router as projects_router
 from .payments import router as payments_router
 from .users import router as users_router
 from .languages import router as languages_router
-from .share import router as share_router
\ No newline at end of file
+from .share import router as share_router
+from .media import router as media_router
\ No newline at end of file
@@ -0,0 +1,127 @@
+import hashlib
+import logging
+import mimetypes
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, Depends, Request, status
+from fastapi.responses import Response
+
+from api import pydantic_models as models
+from api.actions.projects import check_media_access
+from api.responses import MediaResponse
+from core.storages import ProjectFiles
+
+router = APIRouter()
+logger = logging.getLogger("routers")
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses single 'bytes=' range. Returns None if range is malformed (whole
+    file is sent), raises ValueError if range is not satisfiable.
+    """
+    unit, _, ranges = header.partition("=")
+    start, sep, end = ranges.strip().partition("-")
+    if (
+        unit.strip() != "bytes"
+        or not sep
+        or not (start or end)
+        or (start and not start.isdigit())
+        or (end and not end.isdigit())
+    ):
+        return None
+
+    if not start:
+        if int(end) == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - int(end), 0), size - 1
+
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size:
+        raise ValueError("Range start is out of file")
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+@router.api_route(
+    path="/{prj_id}/{file_name}",
+    methods=["GET", "HEAD"],
+    tags=["Media"],
+    description="Get project file, supports range and conditional requests.",
+    responses={
+        401: {"description": "Not authenticated"},
+        404: {"description": "File not found"},
+    },
+)
+async def get_media(
+    file_name: str,
+    request: Request,
+    body: models.ProjectID = Depends(check_media_access),
+) -> Response:
+    if "/" in file_name or file_name.startswith("."):
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+
+    files = ProjectFiles(body.prj_id)
+    stat = files.get_file_stat(file_name)
+    if stat is None:
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+    size, mtime = stat
+
+    etag = '"{}"'.format(
+        hashlib.sha1(f"{body.prj_id}/{file_name}:{size}:{mtime}".encode()).hexdigest()
+    )
+    headers = {
+        "accept-ranges": "bytes",
+        "etag": etag,
+        "last-modified": formatdate(mtime, usegmt=True),
+        "cache-control": "private, no-cache",
+    }
+
+    if _not_modified(request, etag, mtime):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    start, end, status_code = 0, size - 1, status.HTTP_200_OK
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and size and (if_range is None or if_range == etag):
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            headers["content-range"] = f"bytes */{size}"
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers=headers,
+            )
+        if byte_range is not None:
+            start, end = byte_range
+            status_code = status.HTTP_206_PARTIAL_CONTENT
+            headers["content-range"] = f"bytes {start}-{end}/{size}"
+
+    return MediaResponse(
+        files,
+        file_name,
+        start,
+        end,
+        status_code=status_code,
+        headers=headers,
+        media_type=mimetypes.guess_type(file_name)[0] or "application/octet-stream",
+        send_body=request.method != "HEAD",
+    )
@@ -9,7 +9,7 @@ from starlette import status
 
 from api import pydantic_models as models
 from api.exceptions import subscriptionNotExist_exception, notSub_exception, alreadySub_exception
-from api.actions.users import get_current_user
+from api.actions.users import get_current_user, auth_cache
 from db.dals.users import UserDAL
 from db.dals.subscriptions import SubscriptionDAL
 from db.dals.statistics import StatsDAL
@@ -66,11 +66,14 @@ async def webhook_received(
 
         if mode == "payment" and data_object["payment_status"] == "paid":
             async with session.begin():
-                await UserDAL(session).update_balance(user_id, int(quantity))
+                user_dal = UserDAL(session)
+                await user_dal.update_balance(user_id, int(quantity))
                 await StatsDAL(session).create(user_id, 
                     StatEventTypeEnum.bought_minutes,
                     {"amount": quantity}
                 )
+                user = await user_dal.get_by_id(user_id)
+            await auth_cache.invalidate(user.email)
 
             logger.info(
                 f"User({user_id}) has bought {quantity} minutes"
@@ -97,6 +100,7 @@ async def webhook_received(
             sub_dal = SubscriptionDAL(session)
             user = await user_dal.get_by_email(user_email)
             await sub_dal.create_user_sub(user.id, sub_id, stripe_sub_id)
+        await auth_cache.invalidate(user_email)
 
     elif event_type == "invoice.payment_failed":
         # The payment failed or the customer does not have a valid payment method.
@@ -230,6 +234,7 @@ async def cancel_subscription(
 
         stripe.Subscription.modify(user_sub.stripe_sub_id, cancel_at_period_end=True)
         await sub_dal.disable_user_sub(user_sub.id)
+    await auth_cache.invalidate(current_user.email)
 
     return JSONResponse(
         status_code=status.HTTP_200_OK,
@@ -271,6 +276,7 @@ async def reveal_subscription(
             await sub_dal.reactivate_user_sub(current_user.id)
         except Exception as e:
             logger.error(f"FATAL ERROR:\n{e.__str__()}")
+    await auth_cache.invalidate(current_user.email)
 
     return JSONResponse(
         status_code=status.HTTP_200_OK,
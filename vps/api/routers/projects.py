@@ -2,10 +2,14 @@ import os
 import asyncio
 import uuid
 import logging
-from typing import Optional
+from typing import List, Optional
 from datetime import timedelta, datetime, timezone
 
 from celery import signature
+
+from celery_worker.dispatch import dispatch
+from celery_worker.eta import eta, video_minutes
+from celery_worker.pipelines import localization_pipeline
 from fastapi import (
     APIRouter,
     Depends,
@@ -15,7 +19,8 @@ from fastapi import (
     status,
     UploadFile,
     File,
-    BackgroundTasks
+    BackgroundTasks,
+    Query,
 )
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -24,13 +29,17 @@ from sse_starlette.sse import EventSourceResponse
 from api import pydantic_models as models
 from api.exceptions import *
 from api.services import voices, WebsocketService
-from api.actions.users import get_current_user, get_cent_token
+from api.actions.users import get_current_user, get_cent_token, auth_cache
 from api.actions.projects import (
     check_project_ownership,
     check_localization_ownership,
+    decode_cursor,
     delete_localization,
     delete_project,
+    delete_projects_files,
+    encode_cursor,
 )
+from api.actions.scheduling import get_user_priority
 from db.dals.projects import ProjectDAL
 from db.dals.localizations import LocalizationDAL
 from db.dals.feedbacks import FeedbackDAL
@@ -56,23 +65,27 @@ logger = logging.getLogger("routers")
 )
 async def get_projects_list(
     request: Request,
+    limit: int = Query(Config.PROJECTS_PAGE_SIZE, ge=1, le=Config.PROJECTS_PAGE_MAX_SIZE),
+    cursor: Optional[str] = Query(None),
+    statuses: Optional[List[StatusEnum]] = Query(None, alias="status"),
     current_user: models.UserInfo = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ) -> models.ProjectsList:
+    after = decode_cursor(cursor) if cursor else None
     async with db.begin():
         project_dal = ProjectDAL(db)
-        projects = await project_dal.get_list_by_user_id(current_user.id)
-
-    projects_list = []
+        projects = await project_dal.get_page_by_user_id(
+            current_user.id, limit, after=after, statuses=statuses
+        )
 
-    for item in projects:
-        files = ProjectFiles(item.id)
-        prj_dict = item.__dict__
-        prj_dict["source_path"] = files.get_file_link(item.source_name)
-        prj_dict["preview_path"] = files.get_file_link(item.preview_name)
-        projects_list.append(models.ProjectInfo.parse_obj(prj_dict))
+    next_cursor = None
+    if len(projects) == limit:
+        next_cursor = encode_cursor(projects[-1]["created"], projects[-1]["id"])
 
-    return models.ProjectsList(projects=projects_list)
+    return models.ProjectsList(
+        projects=[models.ProjectInfo.parse_obj(item) for item in projects],
+        next_cursor=next_cursor,
+    )
 
 from functools import wraps
 def cent_update(func):
@@ -134,14 +147,19 @@ async def post_create_project(
         if current_user.balance < sec_to_min(video_duration):
             raise notEnoughFunds_exception
 
+        # hashing and copying of the whole video must not block the loop
+        source_hash = await asyncio.to_thread(project_files.dedup_file, file_name)
+
         preview_path = project_files.get_file_path(
             str(uuid.uuid4()) + ".jpg", checks=False)
         preview_from_video(
             project_files.get_file_path(file_name), preview_path)
+        project_files.commit(os.path.basename(preview_path))
 
         async with db.begin():
             project_dal = ProjectDAL(db)
             preview_name = os.path.basename(preview_path)
+            priority = await get_user_priority(db, current_user.id)
             project = await project_dal.create(
                 current_user.id,
                 name,
@@ -150,14 +168,18 @@ async def post_create_project(
                 source_language_id,
                 with_id=project_uuid,
                 duration=video_duration,
+                source_hash=source_hash,
+                priority=priority,
             )
 
-        task = signature(
+        task_id, _ = await dispatch("project", project.id, signature(
             "process_video",
             args=(project.id,),
-        ).delay()
+            priority=project.priority,
+        ))
         async with db.begin():
-            await ProjectDAL(db).update_task_id(project.id, task.id)
+            await ProjectDAL(db).update_task_id(project.id, task_id)
+        await eta.enqueue("project", sec_to_min(video_duration), project.priority)
 
         logger.info(
             f"User({current_user.id}) created new Project({project.id})"
@@ -192,13 +214,12 @@ async def patch_project(
     async with db.begin():
         prj_dal = ProjectDAL(db)
         await prj_dal.update_name(body.prj_id, name)
-        prj = await prj_dal.get_by_id(body.prj_id)
 
     event = {"created": datetime.utcnow(),
              "object": "Project",
              "object_id": body.prj_id,
              "event": "update name",
-             "data": models.ProjectInfo(**prj.__dict__)
+             "data": models.ProjectInfo(**{**request.state.project.__dict__, "name": name})
              }
 
     bg_task.add_task(WebsocketService.publish,
@@ -221,11 +242,13 @@ async def patch_project(
 )
 async def delete_delete_project(
     request: Request,
+    bg_task: BackgroundTasks,
     body: models.ProjectID = Depends(check_project_ownership),
     current_user: models.UserInfo = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ) -> JSONResponse:
-    await delete_project(db, body.prj_id)
+    await delete_project(db, body.prj_id, request.state.project)
+    bg_task.add_task(delete_projects_files, [body.prj_id])
 
     logger.info(f"User({current_user.id}) deleted Project({body.prj_id})")
     return JSONResponse(
@@ -249,17 +272,16 @@ async def get_localizations_list(
 ) -> models.LocalizationsList:
     async with db.begin():
         localization_dal = LocalizationDAL(db)
-        feedback_dal = FeedbackDAL(db)
-        localizations = await localization_dal.get_list_by_project_id(body.prj_id)
+        localizations = await localization_dal.get_list_with_feedback(
+            body.prj_id, current_user.email
+        )
 
     localizations_list = []
     project_files = ProjectFiles(body.prj_id)
 
-    for item in localizations:
+    for item, feedback_status in localizations:
         loc_dict = item.__dict__
-
-        feedback = await feedback_dal.get(email=current_user.email, loc_id=item.id)
-        loc_dict["like"] = FeedbackEnum.empty if feedback is None else feedback.status
+        loc_dict["like"] = FeedbackEnum.empty if feedback_status is None else feedback_status
 
         loc_dict["result_path"] = project_files.get_file_link(
             loc_dict["result_name"], checks=False
@@ -314,58 +336,58 @@ async def post_create_localization(
              "data": ""
              }
 
+    project = request.state.project
+    minutes = sec_to_min(project.duration_in_sec)
+
     async with db.begin():
         target_lang = await LanguagesDAL(db).get_by_id(target_language_id)
         if not target_lang.target:
             raise incorrectLang_exception
+        priority = await get_user_priority(db, current_user.id)
 
-        project_dal = ProjectDAL(db)
-        localization_dal = LocalizationDAL(db)
-        project = await project_dal.get_by_id(body.prj_id)
+    seconds = await eta.estimate(
+        minutes,
+        priority,
+        transcribe=project.status in (StatusEnum.created, StatusEnum.processing),
+    )
 
-        if current_user.balance < sec_to_min(project.duration_in_sec):
+    # balance check and debit are one statement, concurrent requests can't
+    # overspend, the locked user's row is released right after the insert
+    async with db.begin():
+        if await UserDAL(db).debit_balance(current_user.id, minutes) is None:
             raise notEnoughFunds_exception
 
-        seconds = sec_to_min(project.duration_in_sec) * \
-            Config.MIN_PROC_TIME_IN_SEC
-        if project.status == StatusEnum.created:
-            previous_prjs = await project_dal.get_list_created_before(project.created)
-            for prj in previous_prjs:
-                seconds += sec_to_min(prj.duration_in_sec) * \
-                    Config.MIN_PROC_TIME_IN_SEC
-
-        previous_locs = await localization_dal.get_list_created_before(datetime.utcnow())
-        for loc in previous_locs:
-            seconds += sec_to_min(loc.duration_in_sec) * \
-                Config.MIN_PROC_TIME_IN_SEC
-
-        localization = await localization_dal.create(
+        localization = await LocalizationDAL(db).create(
             body.prj_id,
             target_language_id,
             target_voice_name,
             project.duration_in_sec,
-            estimated=datetime.utcnow() + timedelta(seconds=seconds)
+            estimated=datetime.utcnow() + timedelta(seconds=seconds),
+            priority=priority,
         )
-        await UserDAL(db).update_balance(current_user.id, -sec_to_min(project.duration_in_sec))
-        event["object_id"] = localization.id
-        event["data"] = models.LocalizationInfo(**localization.__dict__)
-        bg_task.add_task(WebsocketService.publish,
-                         current_user.id, models.EventInfo(**event))
+
+    # localization of failed project waits for its restart, which puts it
+    # to the ETA backlog
+    if project.status != StatusEnum.failed:
+        await eta.enqueue("localization", minutes, priority)
+    event["object_id"] = localization.id
+    event["data"] = models.LocalizationInfo(**localization.__dict__)
+    bg_task.add_task(WebsocketService.publish,
+                     current_user.id, models.EventInfo(**event))
 
     async with db.begin():
         localization_dal = LocalizationDAL(db)
         if project.status == StatusEnum.processed:
-            task = signature(
-                "process_subs",
-                args=(localization.id,),
-            ).delay()
-            await localization_dal.update_task_id(localization.id, task.id)
+            task_id, _ = await dispatch("localization", localization.id, localization_pipeline(
+                localization.id, localization.priority))
+            await localization_dal.update_task_id(localization.id, task_id)
 
             event["object_id"] = localization.id
             event["data"] = models.LocalizationInfo(**localization.__dict__)
             bg_task.add_task(WebsocketService.publish,
                              current_user.id, models.EventInfo(**event))
 
+    await auth_cache.invalidate(current_user.email)
     logger.info(
         f"User({current_user.id}) created new Localization({localization.id}) for Project({project.id})"
     )
@@ -401,44 +423,59 @@ async def post_restart_localization(
         project_dal = ProjectDAL(db)
         localization_dal = LocalizationDAL(db)
 
-        localization = await localization_dal.get_by_id(body.loc_id)
-        project = await project_dal.get_by_id(localization.project_id)
+        localization = request.state.localization
+        project = request.state.project
 
-        if localization.task_id or project.task_id:
+        # restart of localization in flight is a no-op which answers with id
+        # of the task in flight, processed project keeps id of its chord
+        # callback while the localizations run, that doesn't block restarts
+        in_flight_id = localization.task_id or (
+            project.task_id if project.status != StatusEnum.processed else None
+        )
+        if in_flight_id:
             return JSONResponse(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                content=f"Localization still in process!",
+                status_code=status.HTTP_200_OK,
+                content={"detail": "Localization is already in process", "task_id": in_flight_id},
             )
 
+        # concurrent restarts pass the check above, but only the first one
+        # dispatches the task, others get id of the task in flight
+        task_id, sent = None, False
         if project.status == StatusEnum.failed:
-            task_id = signature(
+            task_id, sent = await dispatch("project", project.id, signature(
                 "process_video",
                 args=(project.id, ),
-            ).delay()
-            project_dal.update_task_id(project.id, task_id)
-
-            event["object_id"] = localization.id
-            event["data"] = models.LocalizationInfo(**localization.__dict__)
-            bg_task.add_task(WebsocketService.publish,
-                             current_user.id, models.EventInfo(**event))
+                priority=project.priority,
+            ))
+            if sent:
+                await project_dal.update_task_id(project.id, task_id)
+                await eta.enqueue(
+                    "project", video_minutes(project.duration_in_sec), project.priority)
 
         elif project.status == StatusEnum.processed:
-            task_id = signature(
-                "process_subs",
-                args=(localization.id, ),
-            ).delay()
-            localization_dal.update_task_id(localization.id, task_id)
+            task_id, sent = await dispatch("localization", localization.id, localization_pipeline(
+                localization.id, localization.priority))
+            if sent:
+                await localization_dal.update_task_id(localization.id, task_id)
+                await eta.enqueue(
+                    "localization", video_minutes(localization.duration_in_sec), localization.priority)
+
+        if not sent:
+            return JSONResponse(
+                status_code=status.HTTP_200_OK,
+                content={"detail": "Localization is already in process", "task_id": task_id},
+            )
 
-            event["object_id"] = localization.id
-            event["data"] = models.LocalizationInfo(**localization.__dict__)
-            bg_task.add_task(WebsocketService.publish,
-                             current_user.id, models.EventInfo(**event))
+        event["object_id"] = localization.id
+        event["data"] = models.LocalizationInfo(**localization.__dict__)
+        bg_task.add_task(WebsocketService.publish,
+                         current_user.id, models.EventInfo(**event))
 
     logger.info(
         f"User({current_user.id}) restarted Localization({localization.id})")
     return JSONResponse(
         status_code=status.HTTP_200_OK,
-        content=f"Localization processing restarted successfully",
+        content={"detail": "Localization processing restarted successfully", "task_id": task_id},
     )
 
 
@@ -454,7 +491,8 @@ async def delete_delete_localization(
     current_user: models.UserInfo = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ) -> JSONResponse:
-    await delete_localization(db, body.loc_id)
+    await delete_localization(
+        db, body.loc_id, request.state.localization, request.state.project)
 
     logger.info(f"User({current_user.id}) deleted Localization({body.loc_id})")
     return JSONResponse(
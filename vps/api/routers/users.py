@@ -10,13 +10,14 @@ from starlette import status
 
 from api import pydantic_models as models
 from api.services import CastdevService
-from api.actions.projects import delete_user_projects
+from api.actions.projects import delete_projects_files, delete_user_projects
 from api.actions.email import send_verify_email_code, send_reset_password_code
 from api.actions.users import (
     create_new_user,
     sso_google,
     get_current_user,
     authenticate_by_login_password,
+    auth_cache,
 )
 from core.security import create_access_token, decode_access_token
 from core.config import Config
@@ -229,6 +230,7 @@ async def change_name(
     async with session.begin():
         user_dal = UserDAL(session)
         await user_dal.update_name(current_user.id, new_name)
+    await auth_cache.invalidate(current_user.email)
 
     logger.info(f"User({current_user.id}) changed name")
     return JSONResponse(
@@ -259,6 +261,7 @@ async def change_email(
                 status_code=status.HTTP_400_BAD_REQUEST, content=f"Incorrect password"
             )
         await user_dal.update_email(current_user.id, new_email)
+    await auth_cache.invalidate(current_user.email)
 
     logger.info(f"User({current_user.id}) changed email")
     return JSONResponse(
@@ -285,6 +288,7 @@ async def change_password(
                 status_code=status.HTTP_400_BAD_REQUEST, content=f"Incorrect password"
             )
         await user_dal.update_password(current_user.id, new_password)
+    await auth_cache.invalidate(current_user.email)
 
     logger.info(f"User({current_user.id}) changed password")
     return JSONResponse(
@@ -302,6 +306,7 @@ async def apply_promocode(
     async with session.begin():
         promo_dal = PromocodesDAL(session)
         num_wands = await promo_dal.apply_promocode(promocode, current_user.id)
+    await auth_cache.invalidate(current_user.email)
 
     logger.info(f"User({current_user.id}) applied promocode")
     return JSONResponse(status_code=status.HTTP_200_OK, content=f"{num_wands} wands")
@@ -309,6 +314,7 @@ async def apply_promocode(
 
 @router.delete(path="/me", tags=["Change user info"], description="Delete account")
 async def delete_account(
+    bg_task: BackgroundTasks,
     form_data: OAuth2PasswordRequestForm = Depends(),
     session: AsyncSession = Depends(get_db),
 ) -> JSONResponse:
@@ -319,9 +325,11 @@ async def delete_account(
         user_dal = UserDAL(session)
         this_user = await user_dal.get_by_email(form_data.username)
 
-    await delete_user_projects(session, this_user.id)
+    prj_ids = await delete_user_projects(session, this_user.id)
     async with session.begin():
         await UserDAL(session).delete(this_user.id)
+    await auth_cache.invalidate(this_user.email)
+    bg_task.add_task(delete_projects_files, prj_ids)
 
     logger.info(f"User with email({form_data.username}) deleted")
     return JSONResponse(
@@ -395,6 +403,7 @@ async def verify_reset_password(
                 content=f"No user with email {email}",
             )
         await user_dal.update_password(user.id, new_password)
+    await auth_cache.invalidate(user.email)
 
     logger.info(f"User({email}) successfully reseted password")
     return JSONResponse(
@@ -480,6 +489,7 @@ async def confirm_verification(
                 content=f"User's email is already verified",
             )
         await user_dal.verify_email(email)
+    await auth_cache.invalidate(email)
     
     logger.info(f"User({email}) successfully confirmed email")
     return JSONResponse(
@@ -508,6 +518,7 @@ async def invitation_to_casdev(
         async with session.begin():
             user_dal = UserDAL(session)
             await user_dal.update_status_invitation_to_castdev(current_user.id)
+        await auth_cache.invalidate(current_user.email)
 
         logger.info(f"User({current_user.id}) used the invitation to castdev")
 
@@ -1,11 +1,16 @@
 import requests
-import time
 import os
+import asyncio
+import contextlib
+import logging
 import datetime
-from typing import Tuple
+from typing import Awaitable, Callable, Optional
 from uuid import UUID
 
+import aiohttp
+
 from elevenlabs import set_api_key, generate, voices
+from elevenlabs.api.error import APIError as SyntAPIError, RateLimitError as SyntRateLimitError
 from pyairtable import Api
 from api import pydantic_models as models
 
@@ -13,102 +18,282 @@ from cent import Client, PublishRequest
 from cent.exceptions import CentError
 
 from core.config import Config
+from core.throttling import CircuitBreaker, TokenBucket
+from core.redis import redis_client
 
+logger = logging.getLogger("services")
+
+
+class ServiceTaskError(Exception):
+    """Task submitted to the service has failed on its side"""
+
+
+# elevenlabs errors carry status of the error detail instead of HTTP one
+SYNT_ERROR_STATUSES = {
+    "too_many_concurrent_requests": 429,
+    "system_busy": 503,
+    "quota_exceeded": 401,
+    "invalid_api_key": 401,
+}
+
+
+def _error_status(e: Exception) -> Optional[int]:
+    if isinstance(e, aiohttp.ClientResponseError):
+        return e.status
+    if isinstance(e, SyntAPIError):
+        if e.status in SYNT_ERROR_STATUSES:
+            return SYNT_ERROR_STATUSES[e.status]
+        if isinstance(e, SyntRateLimitError):
+            return 429
+        if str(e.status).isdigit():
+            return int(e.status)
+        # status code of the HTTP error it was raised while handling
+        e = e.__context__
+    return getattr(getattr(e, "response", None), "status_code", None)
 
-class DubService:
-    URL = Config.DUB_API_URL
-    
-    @classmethod
-    def push(cls, file_path: str) -> str:
-        response = requests.post(
-            cls.URL + "transcribe/files",
-            params={
-                "language": "unknown",
-                "model_size": "medium",
-                "diarize": False,
-                "device": "cuda",
-                "batch_size": 4,
-                "compute_type": "float32",
-                "interpolate_method": "nearest",
-                "min_speakers": 1,
-                "max_speakers": 10,
-                "return_type": "segments",
-            },
-            files=[("files", open(file_path, 'rb'))],
-            auth=("abobus", "amogus"),
-        )
 
-        return response.json()[os.path.basename(file_path)]
+def _is_transient(e: Exception) -> bool:
+    """Timeouts, connection errors, 5xx and 429 are worth another try"""
+    if isinstance(e, (
+        asyncio.TimeoutError,
+        aiohttp.ClientConnectionError,
+        requests.Timeout,
+        requests.ConnectionError,
+    )):
+        return True
+    status = _error_status(e)
+    return status is not None and (status == 429 or status >= 500)
+
+
+def _retry_after(e: Exception) -> Optional[float]:
+    headers = getattr(e, "headers", None) or getattr(getattr(e, "response", None), "headers", None)
+    try:
+        return float(headers["Retry-After"])
+    except (TypeError, KeyError, ValueError):
+        return None
+
+
+class AsyncServiceMixin:
+    """
+    Shared HTTP session and concurrency limit of the service for its async
+    methods. Both are created lazily in the event loop of the worker process.
+    Calls of the service are rate limited across all workers and go through
+    circuit breaker of the process, time spent in both is counted in Redis
+    hash 'metrics:services'. Status polling has its own rate limit, so it
+    doesn't hold back new submissions.
+    """
+    URL = ""
+    NAME = "service"
+    MAX_CONCURRENCY = 1
+    RATE_PER_SEC = 1.0
+    BURST = 1
+    AUTH = aiohttp.BasicAuth("abobus", "amogus")
+
+    _session = None
+    _semaphore = None
+    _bucket = None
+    _poll_bucket = None
+    _breaker = None
 
     @classmethod
-    def get_result(cls, task_id) -> dict:
-        response = requests.post(
-            cls.URL + "tasks/status",
-            params={
-                "task_id": task_id
-            },
-            auth=("abobus", "amogus"),
-        )
+    def bucket(cls) -> TokenBucket:
+        if cls._bucket is None:
+            cls._bucket = TokenBucket(redis_client, cls.NAME, cls.RATE_PER_SEC, cls.BURST)
+        return cls._bucket
 
-        return response.json()
+    @classmethod
+    def poll_bucket(cls) -> TokenBucket:
+        if cls._poll_bucket is None:
+            cls._poll_bucket = TokenBucket(
+                redis_client,
+                f"{cls.NAME}:poll",
+                Config.SERVICE_POLL_RATE_PER_SEC,
+                Config.SERVICE_POLL_BURST,
+            )
+        return cls._poll_bucket
 
     @classmethod
-    def await_result(cls, task_id) -> Tuple[str, str]:
-        while True:
-            ans = cls.get_result(task_id)
-            if ans["status"] == "SUCCESS":
-                result_text = ans["result"]["speakers"]
-                break
+    def breaker(cls) -> CircuitBreaker:
+        if cls._breaker is None:
+            cls._breaker = CircuitBreaker(
+                Config.CIRCUIT_FAILURE_THRESHOLD,
+                Config.CIRCUIT_RESET_SEC,
+                Config.CIRCUIT_MAX_WAIT_SEC,
+            )
+        return cls._breaker
 
-            time.sleep(Config.REQUEST_STATUS_DELAY)
+    @classmethod
+    async def count(cls, metric: str, value: float = 1) -> None:
+        try:
+            await redis_client.hincrbyfloat("metrics:services", f"{cls.NAME}:{metric}", value)
+        except Exception as e:
+            logger.warning(f"Unable to count {cls.NAME} {metric}: {e}")
 
-        return result_text["unknown"]
+    @classmethod
+    async def guarded(
+        cls,
+        func: Callable[..., Awaitable],
+        *args,
+        bucket: Optional[TokenBucket] = None,
+        **kwargs,
+    ):
+        """
+        Calls the service once the rate limit and circuit breaker allow it.
+        Throttled (429) calls are repeated after the pause asked by service,
+        timed out and 5xx ones after exponential backoff, up to
+        SERVICE_MAX_RETRIES times. Other errors are caller's ones, they are
+        raised at once and don't count against the circuit.
+        """
+        bucket = bucket or cls.bucket()
+        for attempt in range(Config.SERVICE_MAX_RETRIES + 1):
+            waited = await cls.breaker().wait()
+            if waited:
+                await cls.count("open_sec", waited)
+            waited = await bucket.acquire()
+            if waited:
+                await cls.count("throttled_sec", waited)
 
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                if not _is_transient(e):
+                    if _error_status(e) is not None:
+                        # service has answered, the request itself is wrong
+                        cls.breaker().success()
+                    raise
+                delay = Config.SERVICE_RETRY_DELAY * 2 ** attempt
+                if _error_status(e) == 429:
+                    # service is alive, it just asks to slow down
+                    cls.breaker().success()
+                    await cls.count("throttled")
+                    delay = _retry_after(e) or delay
+                else:
+                    cls.breaker().failure()
+                    await cls.count("failures")
+                if attempt == Config.SERVICE_MAX_RETRIES:
+                    raise
+                logger.warning(f"{cls.NAME} call failed ({e}), retry in {delay} seconds")
+                await asyncio.sleep(delay)
+                continue
 
-class TransService:
-    URL = Config.TRANS_API_URL
+            cls.breaker().success()
+            return result
 
     @classmethod
-    def push(cls, text, target_lang) -> str:
-        response = requests.post(
-            cls.URL + "translation/text",
-            params={
-                "text": text,
-                "source_language": None,
-                "target_language": target_lang,
-                "translator": "deepl",
-            },
-            auth=("abobus", "amogus"),
-        )
+    def limit(cls) -> asyncio.Semaphore:
+        if cls._semaphore is None:
+            cls._semaphore = asyncio.Semaphore(cls.MAX_CONCURRENCY)
+        return cls._semaphore
 
-        return response.json()["task_id"]
+    @classmethod
+    def session(cls) -> aiohttp.ClientSession:
+        if cls._session is None or cls._session.closed:
+            cls._session = aiohttp.ClientSession(auth=cls.AUTH)
+        return cls._session
 
     @classmethod
-    def get_result(cls, task_id) -> dict:
-        response = requests.post(
-            cls.URL + "tasks/status",
-            params={
-                "task_id": task_id,
-            },
-            auth=("abobus", "amogus"),
-        )
+    async def apost(cls, url: str, poll: bool = False, **kwargs) -> dict:
+        """
+        Form data may be passed as factory, request body is built per try.
+        Factory gets ExitStack to register files it opens, they are closed
+        when the try ends. Polls of task status are limited apart.
+        """
+        if "params" in kwargs:
+            kwargs["params"] = {
+                k: str(v).lower() if isinstance(v, bool) else v
+                for k, v in kwargs["params"].items() if v is not None
+            }
 
-        return response.json()
+        async def post():
+            data = kwargs.get("data")
+            with contextlib.ExitStack() as stack:
+                request_kwargs = {**kwargs, "data": data(stack) if callable(data) else data}
+                async with cls.session().post(url, raise_for_status=True, **request_kwargs) as response:
+                    return await response.json()
+
+        return await cls.guarded(post, bucket=cls.poll_bucket() if poll else None)
 
     @classmethod
-    def await_result(cls, task_id):
+    async def await_task(cls, task_id: str) -> dict:
+        """Polls status of the service task until it succeeds or fails"""
         while True:
-            ans = cls.get_result(task_id)
+            ans = await cls.apost(
+                cls.URL + "tasks/status", poll=True, params={"task_id": task_id}
+            )
             if ans["status"] == "SUCCESS":
-                result_text = ans["result"]["result"]
-                break
+                return ans
+            if ans["status"] in ("FAILURE", "REVOKED"):
+                raise ServiceTaskError(f"{cls.NAME} task {task_id} has failed: {ans.get('result')}")
+            await asyncio.sleep(Config.REQUEST_STATUS_DELAY)
 
-            time.sleep(Config.REQUEST_STATUS_DELAY)
-        
-        return result_text
+
+class DubService(AsyncServiceMixin):
+    URL = Config.DUB_API_URL
+    NAME = "dub"
+    MAX_CONCURRENCY = Config.DUB_MAX_CONCURRENCY
+    RATE_PER_SEC = Config.DUB_RATE_PER_SEC
+    BURST = Config.DUB_BURST
+    PARAMS = {
+        "language": "unknown",
+        "model_size": "medium",
+        "diarize": False,
+        "device": "cuda",
+        "batch_size": 4,
+        "compute_type": "float32",
+        "interpolate_method": "nearest",
+        "min_speakers": 1,
+        "max_speakers": 10,
+        "return_type": "segments",
+    }
+
+    @classmethod
+    async def atranscribe(cls, file_path: str):
+        def form(stack: contextlib.ExitStack) -> aiohttp.FormData:
+            data = aiohttp.FormData()
+            data.add_field(
+                "files",
+                stack.enter_context(open(file_path, "rb")),
+                filename=os.path.basename(file_path),
+            )
+            return data
+
+        async with cls.limit():
+            response = await cls.apost(
+                cls.URL + "transcribe/files", params=cls.PARAMS, data=form
+            )
+            ans = await cls.await_task(response[os.path.basename(file_path)])
+            return ans["result"]["speakers"]["unknown"]
+
+
+class TransService(AsyncServiceMixin):
+    URL = Config.TRANS_API_URL
+    NAME = "trans"
+    MAX_CONCURRENCY = Config.TRANS_MAX_CONCURRENCY
+    RATE_PER_SEC = Config.TRANS_RATE_PER_SEC
+    BURST = Config.TRANS_BURST
+
+    @classmethod
+    async def atranslate(cls, text: str, target_lang: str) -> str:
+        async with cls.limit():
+            response = await cls.apost(
+                cls.URL + "translation/text",
+                params={
+                    "text": text,
+                    "source_language": None,
+                    "target_language": target_lang,
+                    "translator": "deepl",
+                },
+            )
+            ans = await cls.await_task(response["task_id"])
+            return ans["result"]["result"]
     
 
-class SyntService:
+class SyntService(AsyncServiceMixin):
+    NAME = "synt"
+    MAX_CONCURRENCY = Config.SYNT_MAX_CONCURRENCY
+    RATE_PER_SEC = Config.SYNT_RATE_PER_SEC
+    BURST = Config.SYNT_BURST
+
     set_api_key(Config.SYNT_API_KEY)
 
     @classmethod
@@ -118,6 +303,12 @@ class SyntService:
             voice=voice
         )
 
+    @classmethod
+    async def asynt(cls, text: str, voice: str) -> bytes:
+        # elevenlabs client is blocking, it is run in the thread pool
+        async with cls.limit():
+            return await cls.guarded(asyncio.to_thread, cls.synt, text, voice)
+
 
 class CastdevService:
     api = Api(Config.AIRTABLE_API_KEY)
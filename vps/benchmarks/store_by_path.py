@@ -0,0 +1,77 @@
+"""
+Throughput of ProjectFiles.store_by_path copy strategies.
+
+Run from the vps folder with the application environment loaded:
+    python -m benchmarks.store_by_path --size-gb 4 --dir ./temp_folder
+"""
+import os
+import time
+import argparse
+import tempfile
+
+from core.config import Config
+from core.storage_backends import copy_file, _zero_copy
+
+
+def chunked_copy(src_path: str, dst_path: str) -> None:
+    with open(src_path, "rb") as src:
+        with open(dst_path, "wb") as dst:
+            while chunk := src.read(Config.CHUNK_SIZE):
+                dst.write(chunk)
+
+
+def kernel_copy(src_path: str, dst_path: str) -> None:
+    with open(src_path, "rb") as src:
+        with open(dst_path, "wb") as dst:
+            _zero_copy(src.fileno(), dst.fileno(), os.fstat(src.fileno()).st_size)
+
+
+def link_copy(src_path: str, dst_path: str) -> None:
+    copy_file(src_path, dst_path, link=True)
+
+
+def make_source(path: str, size: int) -> None:
+    block = os.urandom(64 * 1024 * 1024)
+    with open(path, "wb") as f:
+        written = 0
+        while written < size:
+            f.write(block[: size - written])
+            written += len(block)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-gb", type=float, default=2)
+    parser.add_argument("--dir", default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    size = int(args.size_gb * 1024 ** 3)
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        src_path = os.path.join(tmp, "source.mp4")
+        make_source(src_path, size)
+
+        for name, func in (
+            ("chunked", chunked_copy),
+            ("kernel", kernel_copy),
+            ("link", link_copy),
+        ):
+            timings = []
+            for i in range(args.repeat):
+                dst_path = os.path.join(tmp, f"{name}_{i}.mp4")
+                started_at = time.perf_counter()
+                func(src_path, dst_path)
+                with open(dst_path, "rb") as f:
+                    os.fsync(f.fileno())
+                timings.append(time.perf_counter() - started_at)
+                os.remove(dst_path)
+
+            best = min(timings)
+            print(
+                f"{name:>8}: best {best:.3f}s, "
+                f"{size / best / 1024 ** 2:.0f} MiB/s (chunk {Config.CHUNK_SIZE})"
+            )
+
+
+if __name__ == "__main__":
+    main()
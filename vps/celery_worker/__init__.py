@@ -1,3 +1,4 @@
 from celery_worker.start_worker import celery_app
+from celery_worker.pipelines import localization_pipeline
 
-__all__ = ['celery_app']
\ No newline at end of file
+__all__ = ['celery_app', 'localization_pipeline']
\ No newline at end of file
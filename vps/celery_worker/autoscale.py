@@ -0,0 +1,50 @@
+import time
+import logging
+
+from celery.worker import state
+from celery.worker.autoscale import Autoscaler
+
+from celery_worker.start_worker import queue_stats
+from core.autoscaling import target_concurrency
+from core.config import Config
+
+logger = logging.getLogger("autoscale")
+
+
+class QueueDepthAutoscaler(Autoscaler):
+    """
+    Sizes the pool by the work queued in the broker for the queues consumed
+    by the worker, instead of the count of prefetched tasks. Queued work is
+    estimated from queue depth and recent task durations of each queue and
+    is checked every AUTOSCALE_POLL_SEC.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._target = self.min_concurrency
+        self._checked_at = 0
+
+    @property
+    def qty(self) -> int:
+        now = time.monotonic()
+        if now - self._checked_at >= Config.AUTOSCALE_POLL_SEC:
+            self._checked_at = now
+            try:
+                self._target = self._compute_target()
+            except Exception as e:
+                logger.warning(f"Unable to read queue stats: {e}")
+        return self._target
+
+    def _compute_target(self) -> int:
+        queues = self.worker.app.amqp.queues
+        queued_sec = 0
+        for queue in (queues.consume_from or queues).keys():
+            duration = queue_stats.duration(queue) or Config.AUTOSCALE_DEFAULT_TASK_SEC
+            queued_sec += queue_stats.depth(queue) * duration
+        return target_concurrency(
+            queued_sec,
+            len(state.reserved_requests),
+            Config.AUTOSCALE_DRAIN_SEC,
+            self.min_concurrency,
+            self.max_concurrency,
+        )
@@ -0,0 +1,63 @@
+import uuid
+from typing import Dict, Tuple
+
+from celery.canvas import Signature
+
+from core.config import Config
+from core.redis import redis_client
+
+lock_key = "dispatch:{}:{}".format
+
+
+async def acquire(kind: str, entity_id: uuid.UUID, task_id: str) -> Tuple[str, bool]:
+    """
+    Locks the entity with the id of the task to be sent. Returns id of the
+    in-flight task and False if the entity is locked already.
+    """
+    key = lock_key(kind, entity_id)
+    while not await redis_client.set(
+        key, task_id, nx=True, ex=Config.DISPATCH_LOCK_TTL_SEC
+    ):
+        in_flight_id = await redis_client.get(key)
+        if in_flight_id is not None:
+            return in_flight_id, False
+    return task_id, True
+
+
+async def acquire_many(kind: str, task_ids: Dict[uuid.UUID, str]) -> Dict[uuid.UUID, str]:
+    """
+    Locks entities in one round trip, returns task ids of the locked ones.
+    Entities locked already are skipped, their tasks are in flight.
+    """
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for entity_id, task_id in task_ids.items():
+            pipe.set(lock_key(kind, entity_id), task_id, nx=True, ex=Config.DISPATCH_LOCK_TTL_SEC)
+        acquired = await pipe.execute()
+    return {
+        entity_id: task_id
+        for (entity_id, task_id), ok in zip(task_ids.items(), acquired) if ok
+    }
+
+
+async def dispatch(kind: str, entity_id: uuid.UUID, sig: Signature) -> Tuple[str, bool]:
+    """
+    Sends the task unless another one is in flight for the entity. Entity is
+    locked with the id of the task before it is sent, so a repeated submit
+    returns id of the in-flight task and sends nothing. Lock is released by
+    the worker when the job is finished, or expires after the TTL.
+    """
+    task_id, acquired = await acquire(kind, entity_id, sig.freeze().id)
+    if not acquired:
+        return task_id, False
+
+    try:
+        sig.apply_async()
+    except Exception:
+        await release(kind, entity_id)
+        raise
+    return task_id, True
+
+
+async def release(kind: str, *entity_ids: uuid.UUID) -> None:
+    if entity_ids:
+        await redis_client.delete(*(lock_key(kind, i) for i in entity_ids))
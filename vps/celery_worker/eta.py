@@ -0,0 +1,121 @@
+import math
+from typing import Dict, Iterable, Tuple
+
+from redis import asyncio as aioredis
+
+from celery_worker.pipelines import LOCALIZATION_STAGES
+from core.config import Config
+from core.redis import redis_client
+
+# Processing stage of the job -> queue its task is consumed from
+PROJECT_STAGES = {"transcribe": "celery"}
+STAGE_QUEUES = {
+    **PROJECT_STAGES,
+    **{queue: queue for queue in LOCALIZATION_STAGES.values()},
+}
+
+
+def video_minutes(secs: float) -> int:
+    return math.ceil(secs / 60) if secs else 0
+
+
+class EtaEngine:
+    """
+    Estimates job completion time from the queued backlog, live worker
+    capacity and per-stage throughput learned from finished jobs.
+
+    Backlog is kept in Redis as minutes of video per job kind and priority
+    and is updated when jobs are queued and finished, so an estimate costs
+    one round trip however long the queue is. Counters are periodically
+    reset from the database, so jobs lost by crashed workers don't skew it.
+    """
+
+    backlog_key = "eta:backlog:{}"
+    rate_key = "eta:rate"
+    capacity_key = "eta:capacity"
+
+    def __init__(self, client: aioredis.Redis):
+        self.client = client
+
+    async def enqueue(self, kind: str, minutes: int, priority: int) -> None:
+        await self.client.hincrby(self.backlog_key.format(kind), priority, minutes)
+
+    async def dequeue(self, kind: str, minutes: int, priority: int) -> None:
+        await self.client.hincrby(self.backlog_key.format(kind), priority, -minutes)
+
+    async def enqueue_many(self, kind: str, jobs: Iterable[Tuple[int, int]]) -> None:
+        """Adds (minutes, priority) jobs to the backlog in one round trip"""
+        async with self.client.pipeline(transaction=False) as pipe:
+            for minutes, priority in jobs:
+                pipe.hincrby(self.backlog_key.format(kind), priority, minutes)
+            await pipe.execute()
+
+    async def dequeue_many(self, kind: str, jobs: Iterable[Tuple[int, int]]) -> None:
+        await self.enqueue_many(kind, ((-minutes, priority) for minutes, priority in jobs))
+
+    async def reset_backlog(self, kind: str, backlog: Dict[int, int]) -> None:
+        """Replaces backlog counters with the ones counted in the database"""
+        key = self.backlog_key.format(kind)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            if backlog:
+                pipe.hset(key, mapping=backlog)
+            await pipe.execute()
+
+    async def record(self, stage: str, minutes: int, seconds: float) -> None:
+        """Updates moving average of stage processing seconds per video minute"""
+        if not minutes:
+            return
+        rate = seconds / minutes
+        old = await self.client.hget(self.rate_key, stage)
+        if old is not None:
+            rate = Config.ETA_EWMA_ALPHA * rate + (1 - Config.ETA_EWMA_ALPHA) * float(old)
+        await self.client.hset(self.rate_key, stage, rate)
+
+    async def set_capacity(self, capacity: Dict[str, int]) -> None:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(self.capacity_key)
+            if capacity:
+                pipe.hset(self.capacity_key, mapping=capacity)
+                pipe.expire(self.capacity_key, Config.ETA_CAPACITY_INTERVAL_SEC * 3)
+            await pipe.execute()
+
+    async def estimate(self, minutes: int, priority: int, transcribe: bool) -> float:
+        """
+        Seconds until the localization of given size and priority is done.
+        Queued jobs of the same or higher priority are drained at the pace of
+        the slowest stage, then the job itself passes every stage. Source of
+        not yet transcribed project waits in the projects queue first.
+        """
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.hgetall(self.backlog_key.format("project"))
+            pipe.hgetall(self.backlog_key.format("localization"))
+            pipe.hgetall(self.rate_key)
+            pipe.hgetall(self.capacity_key)
+            prj_backlog, loc_backlog, rates, capacity = await pipe.execute()
+
+        def rate(stage: str) -> float:
+            if stage in rates:
+                return float(rates[stage])
+            if stage in PROJECT_STAGES:
+                return Config.MIN_PROC_TIME_IN_SEC
+            return Config.MIN_PROC_TIME_IN_SEC / len(LOCALIZATION_STAGES)
+
+        def pace(stages: Iterable[str]) -> float:
+            return max(
+                rate(stage) / max(int(capacity.get(STAGE_QUEUES[stage], 1)), 1)
+                for stage in stages
+            )
+
+        def ahead(backlog: Dict[str, str]) -> int:
+            return max(sum(int(m) for p, m in backlog.items() if int(p) <= priority), 0)
+
+        stages = [stage for stage in STAGE_QUEUES if transcribe or stage not in PROJECT_STAGES]
+        seconds = minutes * sum(rate(stage) for stage in stages)
+        seconds += ahead(loc_backlog) * pace(LOCALIZATION_STAGES.values())
+        if transcribe:
+            seconds += ahead(prj_backlog) * pace(PROJECT_STAGES)
+        return seconds
+
+
+eta = EtaEngine(redis_client)
@@ -0,0 +1,22 @@
+import uuid
+from typing import Union
+
+from celery import chain, signature
+
+
+# Localization pipeline stages, each stage task is routed to its own queue
+LOCALIZATION_STAGES = {
+    "translate_subs": "translate",
+    "synthesize_subs": "synthesize",
+    "mix_subs": "mix",
+    "merge_subs": "merge",
+}
+
+
+def localization_pipeline(loc_id: uuid.UUID, priority: Union[int, None] = None) -> chain:
+    return chain(
+        *(
+            signature(name, args=(loc_id,), immutable=True, priority=priority)
+            for name in LOCALIZATION_STAGES
+        )
+    )
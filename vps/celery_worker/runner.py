@@ -0,0 +1,44 @@
+import os
+import asyncio
+import threading
+
+
+class AsyncRunner:
+    """
+    Event loop running in a background thread of the worker process. Tasks
+    of any pool (prefork, threads) submit coroutines to it, so all of them
+    share one loop, DB engine pool and per-service concurrency limits.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="async-runner", daemon=True
+                )
+                self._thread.start()
+                self._pid = os.getpid()
+        return self._loop
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+
+
+runner = AsyncRunner()
@@ -1,6 +1,19 @@
+import time
+
+import redis
 from celery import Celery
+from celery.signals import (
+    task_postrun,
+    task_prerun,
+    worker_process_init,
+    worker_process_shutdown,
+)
 
+from celery_worker.pipelines import LOCALIZATION_STAGES
+from celery_worker.runner import runner
+from core.autoscaling import QueueStats
 from core.config import Config
+from db.session import engine
 
 
 celery_app = Celery(
@@ -11,3 +24,75 @@ celery_app = Celery(
 )
 
 celery_app.conf.task_track_started = True
+
+# priority queues on redis broker: every queue is split into 10 sub-queues
+# which are consumed in priority order, 0 is the highest priority
+celery_app.conf.broker_transport_options = {
+    "priority_steps": list(range(10)),
+    "sep": ":",
+    "queue_order_strategy": "priority",
+}
+celery_app.conf.task_default_priority = Config.DEFAULT_PRIORITY
+celery_app.conf.worker_prefetch_multiplier = 1
+
+# pool size of workers started with --autoscale follows queued work. The I/O
+# worker keeps fixed thread pool, as its threads share one event loop, DB pool
+# and per-service concurrency limits; it is scaled by replicas.
+celery_app.conf.worker_autoscaler = "celery_worker.autoscale:QueueDepthAutoscaler"
+queue_stats = QueueStats(
+    redis.Redis.from_url(Config.BROKER_URL, decode_responses=True),
+    priority_steps=celery_app.conf.broker_transport_options["priority_steps"],
+    sep=celery_app.conf.broker_transport_options["sep"],
+    alpha=Config.ETA_EWMA_ALPHA,
+)
+_task_started = {}
+
+celery_app.conf.task_routes = {
+    name: {"queue": queue} for name, queue in LOCALIZATION_STAGES.items()
+}
+
+celery_app.conf.beat_schedule = {
+    "collect-garbage": {
+        "task": "collect_garbage",
+        "schedule": Config.GC_INTERVAL_SEC,
+    },
+    "refresh-capacity": {
+        "task": "refresh_capacity",
+        "schedule": Config.ETA_CAPACITY_INTERVAL_SEC,
+    },
+    "reconcile-backlog": {
+        "task": "reconcile_backlog",
+        "schedule": Config.ETA_RECONCILE_INTERVAL_SEC,
+    },
+}
+
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    # connections inherited from the parent process can't be used after fork,
+    # pool process makes its own ones in the loop of the async runner
+    engine.sync_engine.dispose(close=False)
+    runner.loop
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    runner.run(engine.dispose())
+    runner.stop()
+
+
+@task_prerun.connect
+def start_task_timer(task_id, **kwargs):
+    _task_started[task_id] = time.monotonic()
+
+
+@task_postrun.connect
+def record_task_duration(task_id, task, **kwargs):
+    started = _task_started.pop(task_id, None)
+    queue = (task.request.delivery_info or {}).get("routing_key")
+    if started is None or not queue:
+        return
+    try:
+        queue_stats.record(queue, time.monotonic() - started)
+    except redis.RedisError:
+        pass
@@ -7,6 +7,7 @@ from starlette.responses import RedirectResponse
 
 from db.session import engine
 from db.models import User, Promocode, Project, UserPromocode, Localization, Language, Subscription, UserSubscription
+from db.models import ProjectTranscript, LocalizationTranscript
 from core.security import create_access_token, decode_access_token
 from core.config import Config
 
@@ -73,7 +74,6 @@ class ProjectAdmin(ModelView, model=Project):
         Project.duration_in_sec,
         Project.created,
         Project.updated,
-        Project.parsed_speech_data,
         Project.source_language_id,
         Project.status,
     ]
@@ -88,7 +88,6 @@ class LocalizationAdmin(ModelView, model=Localization):
         Localization.created,
         Localization.duration_in_sec,
         Localization.estimated_completion_date,
-        Localization.parsed_speech_data,
         Localization.project_id,
         Localization.result_name,
         Localization.status,
@@ -99,6 +98,24 @@ class LocalizationAdmin(ModelView, model=Localization):
     page_size = 25
 
 
+class ProjectTranscriptAdmin(ModelView, model=ProjectTranscript):
+    column_list = [
+        ProjectTranscript.project_id,
+        ProjectTranscript.speech_data,
+    ]
+    column_searchable_list = [ProjectTranscript.project_id]
+    page_size = 25
+
+
+class LocalizationTranscriptAdmin(ModelView, model=LocalizationTranscript):
+    column_list = [
+        LocalizationTranscript.localization_id,
+        LocalizationTranscript.speech_data,
+    ]
+    column_searchable_list = [LocalizationTranscript.localization_id]
+    page_size = 25
+
+
 class LanguageAdmin(ModelView, model=Language):
     column_list = [Language.id, Language.lang_name, Language.api_name]
     column_default_sort = (Language.id, True)
@@ -158,6 +175,8 @@ def init_admin(app):
     admin.add_view(UserAdmin)
     admin.add_view(ProjectAdmin)
     admin.add_view(LocalizationAdmin)
+    admin.add_view(ProjectTranscriptAdmin)
+    admin.add_view(LocalizationTranscriptAdmin)
     admin.add_view(LanguageAdmin)
     admin.add_view(PromocodeAdmin)
     admin.add_view(UserPromocodeAdmin)
@@ -0,0 +1,77 @@
+import time
+import logging
+from collections import OrderedDict
+from typing import Generic, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+logger = logging.getLogger("auth_cache")
+
+Model = TypeVar("Model", bound=BaseModel)
+
+
+class AuthCache(Generic[Model]):
+    """
+    Short-lived cache of authenticated users. Without a Redis client entries
+    live in an in-process LRU keyed by access token. With a client they are
+    kept only in Redis, keyed by user email and shared by all API processes,
+    so invalidate() is visible to every process at once. Otherwise entries
+    expire after ttl seconds.
+    """
+
+    key = "auth:user:{}"
+
+    def __init__(self, model: Type[Model], ttl: float, max_size: int, client=None):
+        self.model = model
+        self.ttl = ttl
+        self.max_size = max_size
+        self.client = client
+        self._entries: "OrderedDict[str, Tuple[float, str, Model]]" = OrderedDict()
+
+    async def get(self, token: str, email: str) -> Optional[Model]:
+        if self.client is None:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires, cached_email, user = entry
+            if expires > time.monotonic() and cached_email == email:
+                self._entries.move_to_end(token)
+                return user.model_copy()
+            del self._entries[token]
+            return None
+
+        try:
+            data = await self.client.get(self.key.format(email))
+        except Exception as e:
+            logger.warning(f"Unable to read auth cache: {e}")
+            return None
+        if data is None:
+            return None
+        return self.model.model_validate_json(data)
+
+    async def set(self, token: str, email: str, user: Model) -> None:
+        if self.client is None:
+            self._put(token, email, user)
+            return
+        try:
+            await self.client.set(
+                self.key.format(email), user.model_dump_json(), px=int(self.ttl * 1000)
+            )
+        except Exception as e:
+            logger.warning(f"Unable to write auth cache: {e}")
+
+    async def invalidate(self, email: str) -> None:
+        for token in [t for t, (_, e, _) in self._entries.items() if e == email]:
+            del self._entries[token]
+        if self.client is None:
+            return
+        try:
+            await self.client.delete(self.key.format(email))
+        except Exception as e:
+            logger.warning(f"Unable to invalidate auth cache: {e}")
+
+    def _put(self, token: str, email: str, user: Model) -> None:
+        self._entries[token] = (time.monotonic() + self.ttl, email, user)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
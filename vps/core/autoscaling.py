@@ -0,0 +1,51 @@
+import math
+from typing import Iterable, Union
+
+
+class QueueStats:
+    """
+    Reads depth of the broker queues and keeps moving average of task
+    durations per queue in Redis. Broker keeps a queue with priorities as a
+    list per priority step, named '<queue><sep><step>' except the step 0.
+    """
+
+    duration_key = "autoscale:duration"
+
+    def __init__(
+        self,
+        client,
+        priority_steps: Iterable[int] = (0,),
+        sep: str = ":",
+        alpha: float = 0.2,
+    ):
+        self.client = client
+        self.priority_steps = list(priority_steps)
+        self.sep = sep
+        self.alpha = alpha
+
+    def depth(self, queue: str) -> int:
+        return sum(
+            self.client.llen(f"{queue}{self.sep}{step}" if step else queue)
+            for step in self.priority_steps
+        )
+
+    def duration(self, queue: str) -> Union[float, None]:
+        value = self.client.hget(self.duration_key, queue)
+        return None if value is None else float(value)
+
+    def record(self, queue: str, seconds: float) -> None:
+        old = self.duration(queue)
+        if old is not None:
+            seconds = self.alpha * seconds + (1 - self.alpha) * old
+        self.client.hset(self.duration_key, queue, seconds)
+
+
+def target_concurrency(
+    queued_sec: float, busy: int, drain_sec: float, min_concurrency: int, max_concurrency: int
+) -> int:
+    """
+    Pool size which keeps busy processes and drains work queued for the
+    worker (in seconds of processing) in drain_sec.
+    """
+    target = busy + math.ceil(queued_sec / drain_sec)
+    return max(min_concurrency, min(target, max_concurrency))
@@ -25,18 +25,77 @@ class AppConfig:
     TRANS_API_URL: str
     SYNT_API_KEY: str
     REQUEST_STATUS_DELAY: int
+    DUB_MAX_CONCURRENCY: int = 2
+    TRANS_MAX_CONCURRENCY: int = 16
+    SYNT_MAX_CONCURRENCY: int = 4
+    DUB_RATE_PER_SEC: float = 1.0
+    DUB_BURST: int = 2
+    TRANS_RATE_PER_SEC: float = 20.0
+    TRANS_BURST: int = 40
+    SYNT_RATE_PER_SEC: float = 2.0
+    SYNT_BURST: int = 4
+    SERVICE_POLL_RATE_PER_SEC: float = 10.0
+    SERVICE_POLL_BURST: int = 20
+    SERVICE_MAX_RETRIES: int = 5
+    SERVICE_RETRY_DELAY: float = 1.0
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_RESET_SEC: int = 30
+    CIRCUIT_MAX_WAIT_SEC: int = 600
+
+    SUBSCRIBER_PRIORITY: int = 0
+    DEFAULT_PRIORITY: int = 4
+    FAIR_SHARE_STEP: int = 2
+    ETA_EWMA_ALPHA: float = 0.2
+    ETA_CAPACITY_INTERVAL_SEC: int = 30
+    ETA_RECONCILE_INTERVAL_SEC: int = 300
+    DISPATCH_LOCK_TTL_SEC: int = 21600
+    AUTOSCALE_POLL_SEC: int = 5
+    AUTOSCALE_DRAIN_SEC: int = 300
+    AUTOSCALE_DEFAULT_TASK_SEC: int = 60
 
     POSTGRES_URL: str
     POSTGRES_URL_ALEMBIC: str
+    DB_PROFILE: str = "api"
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_WORKER_POOL_SIZE: int = 2
+    DB_WORKER_MAX_OVERFLOW: int = 2
+    DB_POOL_TIMEOUT_SEC: int = 30
+    DB_POOL_RECYCLE_SEC: int = 1800
+    DB_PRE_PING: bool = False
+    DB_WORKER_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PGBOUNCER: bool = False
 
     SQLADMIN_USER: str
     SQLADMIN_PASSWORD: str
 
     FILE_ROOT: str
+    STORAGE_BACKEND: str = "local"
+    S3_ENDPOINT_URL: str = ""
+    S3_BUCKET: str = ""
+    S3_ACCESS_KEY: str = ""
+    S3_SECRET_KEY: str = ""
+    S3_REGION: str = ""
+    S3_PUBLIC_URL: str = ""
+    S3_LINK_EXPIRE_SECONDS: int = 3600
+    S3_MULTIPART_CHUNK_SIZE: int = 67108864
+
+    SCRATCH_ROOT: str = "./scratch"
+    SCRATCH_MAX_BYTES: int = 21474836480
+    SCRATCH_HIGH_WATERMARK: float = 0.9
+    SCRATCH_LOW_WATERMARK: float = 0.8
+
+    GC_INTERVAL_SEC: int = 3600
+    GC_FILE_MAX_AGE_SEC: int = 86400
 
     ACCESS_TOKEN_EXPIRE_MINUTES: float
+    AUTH_CACHE_TTL_SEC: float = 5.0
+    AUTH_CACHE_SIZE: int = 10000
+    AUTH_CACHE_REDIS: bool = False
     EMAIL_CODE_EXPIRE_MINUTES: float
     SHARE_TOKEN_EXPIRE_WEEK: int
+    MEDIA_TOKEN_EXPIRE_MINUTES: int = 120
 
     BROKER_URL: str
     BACKEND_URL: str
@@ -53,6 +112,8 @@ class AppConfig:
     MESSAGE_STREAM_DELAY: int
     MIN_PROC_TIME_IN_SEC: int
     VIDEO_MAX_DURATION: int
+    PROJECTS_PAGE_SIZE: int = 50
+    PROJECTS_PAGE_MAX_SIZE: int = 200
 
     AIRTABLE_API_KEY: str
     AIRTABLE_TABLE_NAME: str
@@ -0,0 +1,8 @@
+from redis import asyncio as aioredis
+
+from core.config import Config
+
+
+# Broker Redis is also used for ETA statistics, dispatch locks, throttling
+# and auth cache
+redis_client = aioredis.Redis.from_url(Config.BROKER_URL, decode_responses=True)
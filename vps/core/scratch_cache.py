@@ -0,0 +1,134 @@
+import os
+import contextlib
+import time
+import uuid
+import fcntl
+import shutil
+from typing import Callable, List, Tuple
+
+
+class ScratchCache:
+    """
+    Worker-local LRU cache of files pulled from the shared storage.
+
+    Entries are filled atomically under a per-key file lock, so concurrent
+    tasks of one node download the same file once. Least recently used
+    entries are evicted when the cache exceeds max_bytes or the disk usage
+    exceeds high_watermark, until both fall below the low limits.
+    """
+
+    lock_suffix = ".lock"
+    part_suffix = ".part"
+
+    def __init__(
+        self,
+        root: str,
+        max_bytes: int,
+        high_watermark: float = 0.9,
+        low_watermark: float = 0.8,
+        min_age: float = 60,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.min_age = min_age
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def fetch(self, key: str, fill: Callable[[str], None]) -> str:
+        path = self.path(key)
+        if self._touch(path):
+            return path
+        return self._fill(path, fill, replace=False)
+
+    def store(self, key: str, file_path: str) -> str:
+        """Moves the file into the cache, cached entry of the key is replaced"""
+        return self._fill(
+            self.path(key), lambda part_path: shutil.move(file_path, part_path), replace=True
+        )
+
+    def _fill(self, path: str, fill: Callable[[str], None], replace: bool) -> str:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + self.lock_suffix, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if replace or not self._touch(path):
+                    part_path = f"{path}.{uuid.uuid4()}{self.part_suffix}"
+                    try:
+                        fill(part_path)
+                        os.replace(part_path, path)
+                    finally:
+                        if os.path.exists(part_path):
+                            os.remove(part_path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+        self.evict()
+        return path
+
+    def evict(self) -> int:
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        usage = shutil.disk_usage(self.root)
+        used = usage.used / usage.total
+        if total <= self.max_bytes and used <= self.high_watermark:
+            return 0
+
+        freed = 0
+        now = time.time()
+        for path, size, used_at in sorted(entries, key=lambda e: e[2]):
+            if total <= self.max_bytes * self.low_watermark and used <= self.low_watermark:
+                break
+            if now - used_at < self.min_age:
+                continue
+            if not self._remove(path):
+                continue
+            total -= size
+            used -= size / usage.total
+            freed += size
+        return freed
+
+    def _remove(self, path: str) -> bool:
+        """
+        Removes entry with its lock file, entry being filled right now is kept.
+        Fetcher still waiting on the removed lock may fill the entry once
+        more, that is harmless as fills are atomic.
+        """
+        lock_path = path + self.lock_suffix
+        with open(lock_path, "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            try:
+                os.remove(path)
+                return True
+            except FileNotFoundError:
+                return False
+            finally:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(lock_path)
+
+    def _touch(self, path: str) -> bool:
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _entries(self) -> List[Tuple[str, int, float]]:
+        entries = []
+        for dir_path, _, file_names in os.walk(self.root):
+            for file_name in file_names:
+                if file_name.endswith((self.lock_suffix, self.part_suffix)):
+                    continue
+                path = os.path.join(dir_path, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
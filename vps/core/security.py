@@ -1,3 +1,4 @@
+import time
 from datetime import datetime, timedelta
 
 from fastapi.security import OAuth2PasswordBearer
@@ -8,6 +9,7 @@ from core.config import Config
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login", auto_error=False)
 
 
 def create_access_token(data: dict, email=False):
@@ -39,6 +41,18 @@ def decode_access_token(token: str):
 
     return email, aim
 
+def decode_token(token: str) -> dict:
+    try:
+        payload = jwt.decode(token, Config.SECRET_KEY, algorithms=[Config.ALGORITHM])
+        if payload.get("aim") is None:
+            raise credentials_exception
+    except ExpiredSignatureError:
+        raise tokenExpired_exception
+    except JWTError:
+        raise credentials_exception
+
+    return payload
+
 def create_share_token(data: dict) -> str:
     encode = data.copy()
 
@@ -63,6 +77,18 @@ def decode_share_token(token: str):
     
     return id, aim
 
+def create_media_token(prj_id: str) -> str:
+    """
+    Short-lived token for media links, grants reading files of one project.
+    Expiry is rounded up to the end of the next TTL window, so links stay the
+    same within the window and browsers can revalidate cached media.
+    """
+    window = Config.MEDIA_TOKEN_EXPIRE_MINUTES * 60
+    expire = (int(time.time()) // window + 2) * window
+    encode = {"aim": "media", "prj_id": str(prj_id), "exp": expire}
+
+    return jwt.encode(encode, Config.SECRET_KEY, algorithm=Config.ALGORITHM)
+
 def create_cent_token(data: dict) -> str:
     encode = data.copy()
     encode.update({"exp": datetime.utcnow() + timedelta(weeks=Config.SHARE_TOKEN_EXPIRE_WEEK)})
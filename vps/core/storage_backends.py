@@ -0,0 +1,280 @@
+import os
+import errno
+import shutil
+from abc import ABC, abstractmethod
+from typing import Iterator, Tuple, Union
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+
+from core.config import Config
+from core.security import create_media_token
+
+
+def _zero_copy(src_fd: int, dst_fd: int, size: int) -> None:
+    offset = 0
+    while offset < size:
+        if hasattr(os, "copy_file_range"):
+            sent = os.copy_file_range(src_fd, dst_fd, size - offset)
+        else:
+            sent = os.sendfile(dst_fd, src_fd, offset, size - offset)
+        if sent == 0:
+            break
+        offset += sent
+
+
+def copy_file(src_path: str, dst_path: str, link: bool = True) -> None:
+    """
+    Copy file without passing its content through user space: hard link if
+    both paths are on one filesystem, in-kernel copy otherwise. Falls back to
+    chunked read/write when neither is supported.
+    """
+    if link:
+        try:
+            os.link(src_path, dst_path)
+            return
+        except OSError:
+            pass
+
+    with open(src_path, "rb") as src:
+        with open(dst_path, "wb") as dst:
+            try:
+                _zero_copy(src.fileno(), dst.fileno(), os.fstat(src.fileno()).st_size)
+                return
+            except OSError:
+                src.seek(0)
+                dst.seek(0)
+                dst.truncate()
+            while chunk := src.read(Config.CHUNK_SIZE):
+                dst.write(chunk)
+
+
+class StorageBackend(ABC):
+    """Interface of the storage which keeps project files"""
+
+    @abstractmethod
+    def put(self, key: str, file_path: str) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, key: str, file_path: str) -> None:
+        ...
+
+    @abstractmethod
+    def stream(
+        self, key: str, start: int = 0, end: Union[int, None] = None
+    ) -> Iterator[bytes]:
+        ...
+
+    @abstractmethod
+    def stat(self, key: str) -> Union[Tuple[int, float], None]:
+        """Returns size and modification timestamp of the file if it exists"""
+        ...
+
+    @abstractmethod
+    def copy(self, src_key: str, dst_key: str) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str) -> None:
+        ...
+
+    @abstractmethod
+    def link(self, key: str) -> str:
+        ...
+
+    @abstractmethod
+    def scan(self, prefix: str = "") -> Iterator[Tuple[str, int, float]]:
+        """Yields key, size and modification timestamp of every stored file"""
+        ...
+
+    def size(self, key: str) -> Union[int, None]:
+        stat = self.stat(key)
+        return None if stat is None else stat[0]
+
+    def exists(self, key: str) -> bool:
+        return self.stat(key) is not None
+
+
+class LocalStorage(StorageBackend):
+    """Files are kept on the local (or host mounted) disk under root folder"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def put(self, key: str, file_path: str) -> None:
+        dst_path = self.path(key)
+        if os.path.abspath(file_path) == os.path.abspath(dst_path):
+            return
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        copy_file(file_path, dst_path, link=False)
+
+    def get(self, key: str, file_path: str) -> None:
+        src_path = self.path(key)
+        if os.path.abspath(file_path) == os.path.abspath(src_path):
+            return
+        copy_file(src_path, file_path, link=False)
+
+    def stream(
+        self, key: str, start: int = 0, end: Union[int, None] = None
+    ) -> Iterator[bytes]:
+        with open(self.path(key), "rb") as f:
+            f.seek(start)
+            left = None if end is None else end - start + 1
+            while left is None or left > 0:
+                size = Config.CHUNK_SIZE if left is None else min(left, Config.CHUNK_SIZE)
+                chunk = f.read(size)
+                if not chunk:
+                    break
+                if left is not None:
+                    left -= len(chunk)
+                yield chunk
+
+    def stat(self, key: str) -> Union[Tuple[int, float], None]:
+        try:
+            stat = os.stat(self.path(key))
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime
+
+    def copy(self, src_key: str, dst_key: str) -> None:
+        dst_path = self.path(dst_key)
+        tmp_path = dst_path + ".tmp"
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        copy_file(self.path(src_key), tmp_path)
+        os.replace(tmp_path, dst_path)
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+    def delete_prefix(self, prefix: str) -> None:
+        shutil.rmtree(self.path(prefix), ignore_errors=True)
+
+    def link(self, key: str) -> str:
+        prj_id = key.split("/", 1)[0]
+        return f"{os.path.join(Config.FILES_URL, key)}?token={create_media_token(prj_id)}"
+
+    def scan(self, prefix: str = "") -> Iterator[Tuple[str, int, float]]:
+        for dir_path, _, file_names in os.walk(self.path(prefix)):
+            for file_name in file_names:
+                path = os.path.join(dir_path, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield os.path.relpath(path, self.root), stat.st_size, stat.st_mtime
+
+
+class S3Storage(StorageBackend):
+    """Files are kept in S3 compatible object storage (AWS S3, MinIO, ...)"""
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Union[str, None] = None,
+        access_key: Union[str, None] = None,
+        secret_key: Union[str, None] = None,
+        region: Union[str, None] = None,
+        public_url: Union[str, None] = None,
+    ):
+        self.bucket = bucket
+        self.public_url = public_url
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            aws_access_key_id=access_key or None,
+            aws_secret_access_key=secret_key or None,
+            region_name=region or None,
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=Config.S3_MULTIPART_CHUNK_SIZE,
+            multipart_chunksize=Config.S3_MULTIPART_CHUNK_SIZE,
+        )
+
+    def put(self, key: str, file_path: str) -> None:
+        self.client.upload_file(
+            file_path, self.bucket, key, Config=self.transfer_config
+        )
+
+    def get(self, key: str, file_path: str) -> None:
+        self.client.download_file(
+            self.bucket, key, file_path, Config=self.transfer_config
+        )
+
+    def stream(
+        self, key: str, start: int = 0, end: Union[int, None] = None
+    ) -> Iterator[bytes]:
+        byte_range = f"bytes={start}-" if end is None else f"bytes={start}-{end}"
+        response = self.client.get_object(Bucket=self.bucket, Key=key, Range=byte_range)
+        yield from response["Body"].iter_chunks(Config.CHUNK_SIZE)
+
+    def stat(self, key: str) -> Union[Tuple[int, float], None]:
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                return None
+            raise
+        return response["ContentLength"], response["LastModified"].timestamp()
+
+    def copy(self, src_key: str, dst_key: str) -> None:
+        self.client.copy(
+            {"Bucket": self.bucket, "Key": src_key},
+            self.bucket,
+            dst_key,
+            Config=self.transfer_config,
+        )
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def delete_prefix(self, prefix: str) -> None:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix.rstrip("/") + "/"):
+            objects = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
+            if objects:
+                self.client.delete_objects(
+                    Bucket=self.bucket, Delete={"Objects": objects}
+                )
+
+    def link(self, key: str) -> str:
+        if self.public_url:
+            return os.path.join(self.public_url, key)
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=Config.S3_LINK_EXPIRE_SECONDS,
+        )
+
+    def scan(self, prefix: str = "") -> Iterator[Tuple[str, int, float]]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                yield obj["Key"], obj["Size"], obj["LastModified"].timestamp()
+
+
+def create_backend(root: str) -> StorageBackend:
+    if Config.STORAGE_BACKEND == "local":
+        return LocalStorage(root)
+    if Config.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            bucket=Config.S3_BUCKET,
+            endpoint_url=Config.S3_ENDPOINT_URL,
+            access_key=Config.S3_ACCESS_KEY,
+            secret_key=Config.S3_SECRET_KEY,
+            region=Config.S3_REGION,
+            public_url=Config.S3_PUBLIC_URL,
+        )
+    raise ValueError(f"Unknown storage backend '{Config.STORAGE_BACKEND}'")
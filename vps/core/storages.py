@@ -1,30 +1,165 @@
 import os
 import errno
 import uuid
+import hashlib
+import shutil
+import time
 import subprocess
-from typing import Union
+from typing import Dict, Iterator, Set, Tuple, Union
 
 from fastapi import UploadFile
 
 from core.config import Config
+from core.storage_backends import create_backend, copy_file, LocalStorage
+from core.scratch_cache import ScratchCache
 
 ROOT = "./temp_folder"
+SOURCES_PREFIX = "_sources"
+
+backend = create_backend(ROOT)
+scratch_cache = ScratchCache(
+    Config.SCRATCH_ROOT,
+    Config.SCRATCH_MAX_BYTES,
+    high_watermark=Config.SCRATCH_HIGH_WATERMARK,
+    low_watermark=Config.SCRATCH_LOW_WATERMARK,
+)
+
+
+def file_digest(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        while chunk := file.read(Config.CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _remove_older(path: str, expire_before: float) -> int:
+    try:
+        stat = os.stat(path)
+        if stat.st_mtime >= expire_before:
+            return 0
+        os.remove(path)
+    except FileNotFoundError:
+        return 0
+    return stat.st_size
+
+
+def _is_referenced(file_name: str, names: Set[str]) -> bool:
+    """
+    File is referenced by its name or, for checkpoints of localization
+    stages ('frag_<loc_id>_<n>.mp3', 'mix_<loc_id>.wav'), by localization id.
+    Partially written files are never referenced.
+    """
+    if file_name in names:
+        return True
+    if file_name.endswith(".part"):
+        return False
+    parts = file_name.split(".", 1)[0].split("_")
+    return len(parts) > 1 and parts[1] in names
+
+
+def _collect_local_garbage(referenced: Dict[str, Set[str]], expire_before: float) -> int:
+    reclaimed = 0
+    for dir_name in os.listdir(ROOT):
+        dir_path = os.path.join(ROOT, dir_name)
+        # folder may be removed meanwhile, e.g. by project deletion
+        try:
+            if not os.path.isdir(dir_path):
+                continue
+
+            if dir_name == SOURCES_PREFIX:
+                for file_name in os.listdir(dir_path):
+                    file_path = os.path.join(dir_path, file_name)
+                    try:
+                        if os.stat(file_path).st_nlink == 1:
+                            reclaimed += _remove_older(file_path, expire_before)
+                    except FileNotFoundError:
+                        continue
+                continue
+
+            dir_mtime = os.stat(dir_path).st_mtime
+            file_names = referenced.get(dir_name, set())
+            for file_name in os.listdir(dir_path):
+                if not _is_referenced(file_name, file_names):
+                    reclaimed += _remove_older(os.path.join(dir_path, file_name), expire_before)
+
+            if (
+                dir_name not in referenced
+                and not os.listdir(dir_path)
+                and dir_mtime < expire_before
+            ):
+                os.rmdir(dir_path)
+        except FileNotFoundError:
+            continue
+    return reclaimed
+
+
+def _collect_stored_garbage(referenced: Dict[str, Set[str]], expire_before: float) -> int:
+    reclaimed = 0
+    for key, size, mtime in backend.scan():
+        if mtime >= expire_before:
+            continue
+        prefix, _, file_name = key.partition("/")
+        if prefix == SOURCES_PREFIX:
+            if os.path.splitext(file_name)[0] in referenced.get(SOURCES_PREFIX, set()):
+                continue
+        elif _is_referenced(file_name, referenced.get(prefix, set())):
+            continue
+        backend.delete(key)
+        reclaimed += size
+    return reclaimed
+
+
+def collect_garbage(referenced: Dict[str, Set[str]], max_age: float) -> int:
+    """
+    Remove files which are not referenced by any project or localization and
+    weren't modified for max_age seconds: folders of deleted projects,
+    leftovers of failed runs and sources without project links. Checkpoints
+    of not processed localizations are kept for their restart. Stored
+    objects of remote backends are reconciled the same way as local files.
+    Returns amount of reclaimed bytes.
+    """
+    expire_before = time.time() - max_age
+    reclaimed = _collect_local_garbage(referenced, expire_before)
+    if not isinstance(backend, LocalStorage):
+        reclaimed += _collect_stored_garbage(referenced, expire_before)
+    return reclaimed
 
 
 class ProjectFiles:
+    """
+    Project files are kept by storage backend under '<project_id>/' prefix,
+    while './temp_folder/<project_id>' is used as local working copy of them.
+    """
+
     def __init__(self, id: uuid.UUID):
-        self._root_path = os.path.join(ROOT, str(id))
+        self._id = str(id)
+        self._backend = backend
+        self._root_path = os.path.join(ROOT, self._id)
         if not os.path.isdir(self._root_path):
             os.mkdir(self._root_path)
 
+    def _key(self, file_name: str) -> str:
+        return f"{self._id}/{file_name}"
+
+    def commit(self, file_name: str) -> str:
+        """
+        Push local working copy of the file to the storage backend. Copy of
+        the file stored remotely is moved to the scratch cache, which bounds
+        disk usage of the node, get_file_path() finds it there.
+        """
+        key = self._key(file_name)
+        file_path = self.get_file_path(file_name)
+        self._backend.put(key, file_path)
+        if not isinstance(self._backend, LocalStorage):
+            scratch_cache.store(key, file_path)
+        return file_name
+
     def store_by_path(self, file_path: str) -> str:
         _, ext = os.path.splitext(file_path)
         new_path = os.path.join(self._root_path, str(uuid.uuid4()) + ext)
-        with open(file_path, "rb") as file:
-            with open(new_path, "wb") as f:
-                while chunk := file.read(Config.CHUNK_SIZE):
-                    f.write(chunk)
-        return os.path.basename(new_path)
+        copy_file(file_path, new_path)
+        return self.commit(os.path.basename(new_path))
 
     async def store_by_obj(self, file: UploadFile) -> str:
         _, ext = os.path.splitext(file.filename)
@@ -32,12 +167,24 @@ class ProjectFiles:
         with open(new_path, "wb") as f:
             while chunk := await file.read(Config.CHUNK_SIZE):
                 f.write(chunk)
-        return os.path.basename(new_path)
-    
-    def store_by_bytes(self, bytes: bytes, basename: str) -> str:
+        return self.commit(os.path.basename(new_path))
+
+    def store_by_bytes(self, bytes: bytes, basename: str, persist: bool = True) -> str:
+        """
+        File is written under temporary name and renamed, so existing file is
+        never a partially written one.
+        """
         new_path = os.path.join(self._root_path, basename)
-        with open(new_path, "wb") as f:
-            f.write(bytes)
+        tmp_path = f"{new_path}.{uuid.uuid4()}.part"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(bytes)
+            os.replace(tmp_path, new_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        if persist:
+            self.commit(basename)
         return os.path.basename(new_path)
 
     def store_by_youtube_url(self, url: str) -> str:
@@ -56,32 +203,69 @@ class ProjectFiles:
         if not os.path.isfile(download_path):
             raise Exception(
                 "ProjectFiles: cannot download video from {}".format(url))
-        return os.path.basename(download_path)
+        return self.commit(os.path.basename(download_path))
+
+    def dedup_file(self, file_name: str) -> str:
+        """
+        Keep file content once in content-addressed '_sources/' storage, the
+        project file refers to it (hard link on local disk). Returns content
+        hash of the file.
+        """
+        source_hash = file_digest(self.get_file_path(file_name))
+        _, ext = os.path.splitext(file_name)
+        source_key = f"{SOURCES_PREFIX}/{source_hash}{ext}"
+
+        if self._backend.exists(source_key):
+            self._backend.copy(source_key, self._key(file_name))
+        else:
+            self._backend.copy(self._key(file_name), source_key)
+        return source_hash
 
     def delete_file(self, file_name: str) -> bool:
-        file_path = self.get_file_path(file_name)
+        file_path = self.get_file_path(file_name, checks=False)
         try:
             os.remove(file_path)
         except OSError as e:
             if e.errno != errno.ENOENT:
                 raise
+        self._backend.delete(self._key(file_name))
         return True
 
     def delete_files(self) -> bool:
-        for file_name in os.listdir(self._root_path):
-            self.delete_file(file_name)
-        os.rmdir(self._root_path)
-        return True        
-    
+        shutil.rmtree(self._root_path, ignore_errors=True)
+        self._backend.delete_prefix(self._id)
+        return True
+
     def get_file_link(self, file_name: str, checks: bool = True) -> str:
-        path = self.get_file_path(file_name, checks)
-        if not path:
+        if not file_name:
+            if checks:
+                raise Exception(
+                    "ProjectFiles: Wrong file name requested '{}'".format(file_name)
+                )
             return None
-        link = os.path.join(
-            Config.FILES_URL,
-            path.replace(f"{ROOT}/", "")
-        )
-        return link
+        key = self._key(file_name)
+        if checks and not self._backend.exists(key):
+            raise Exception(
+                "ProjectFiles: File isn't exist '{}'".format(key)
+            )
+        return self._backend.link(key)
+
+    def has_file(self, file_name: str) -> bool:
+        return self._backend.exists(self._key(file_name))
+
+    def get_file_stat(self, file_name: str) -> Union[Tuple[int, float], None]:
+        return self._backend.stat(self._key(file_name))
+
+    def stream_file(
+        self, file_name: str, start: int = 0, end: Union[int, None] = None
+    ) -> Iterator[bytes]:
+        return self._backend.stream(self._key(file_name), start, end)
+
+    def get_stored_path(self, file_name: str) -> Union[str, None]:
+        """Path of the stored file if backend keeps it on local disk"""
+        if isinstance(self._backend, LocalStorage):
+            return self._backend.path(self._key(file_name))
+        return None
 
     def get_file_path(self, file_name: str, checks: bool = True) -> Union[str, None]:
         if not file_name:
@@ -93,6 +277,11 @@ class ProjectFiles:
                 return None
         file_path = os.path.join(self._root_path, file_name)
         if checks and not os.path.isfile(file_path):
+            key = self._key(file_name)
+            if not isinstance(self._backend, LocalStorage) and self._backend.exists(key):
+                return scratch_cache.fetch(
+                    key, lambda path: self._backend.get(key, path)
+                )
             raise Exception(
                 "ProjectFiles: File isn't exist '{}'".format(file_path)
             )
@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+# Reserves a token of the bucket, token count goes below zero when callers
+# have to wait, so each of them sleeps exactly until its own token is ready
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate) - 1
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil((burst - tokens) / rate) + 1)
+if tokens >= 0 then
+    return '0'
+end
+return tostring(-tokens / rate)
+"""
+
+
+class TokenBucket:
+    """
+    Request rate limit shared by all processes through Redis: rate tokens
+    per second are added to the bucket of burst size, every call takes one.
+    """
+
+    def __init__(self, client, name: str, rate: float, burst: int):
+        self.client = client
+        self.key = f"throttling:bucket:{name}"
+        self.rate = rate
+        self.burst = burst
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def acquire(self) -> float:
+        """Waits for the token, returns seconds waited"""
+        wait = float(await self._script(keys=[self.key], args=[self.rate, self.burst]))
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class CircuitBreaker:
+    """
+    Stops calls to the service after threshold failures in a row. When reset
+    timeout passes one probe call is let through, its success closes the
+    circuit, failure keeps it open for another timeout. Callers wait while
+    circuit is open, up to max_wait seconds.
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float, max_wait: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.max_wait = max_wait
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    async def wait(self) -> float:
+        """Waits until the call is allowed, returns seconds waited"""
+        waited = 0
+        while self.is_open:
+            left = self.opened_at + self.reset_timeout - time.monotonic()
+            if left <= 0 and not self.probing:
+                self.probing = True
+                break
+            delay = max(left, 1)
+            if waited + delay > self.max_wait:
+                raise CircuitOpenError(f"Circuit is open for {waited:.0f} seconds")
+            await asyncio.sleep(delay)
+            waited += delay
+        return waited
+
+    def success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def failure(self) -> None:
+        self.failures += 1
+        self.probing = False
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
@@ -1,13 +1,17 @@
 import uuid
 from datetime import datetime
-from typing import Union, List
+from typing import Dict, Union, List, Tuple
 
-from sqlalchemy import select
+from sqlalchemy import select, func
 from sqlalchemy import update, delete, null
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import Select
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.models import Localization, Project
-from core.status import StatusEnum
+from db.models import Localization, LocalizationTranscript, Project, Language, User, Feedback
+from core.config import Config
+from core.status import StatusEnum, FeedbackEnum
 
 
 class LocalizationDAL:
@@ -22,14 +26,16 @@ class LocalizationDAL:
         target_lang_id: uuid.UUID,
         target_voice_name: str,
         duration: int,
-        estimated: datetime
+        estimated: datetime,
+        priority: int = Config.DEFAULT_PRIORITY,
     ) -> Localization:
         new_loc = Localization(
             project_id=prj_id,
             target_language_id=target_lang_id,
             target_voice_name=target_voice_name,
             duration_in_sec=duration,
-            estimated_completion_date=estimated
+            estimated_completion_date=estimated,
+            priority=priority,
         )
 
         self.db_session.add(new_loc)
@@ -48,17 +54,102 @@ class LocalizationDAL:
         await self.db_session.flush()
         return True
 
+    async def delete_by_project_ids(self, prj_ids: Union[List[uuid.UUID], Select]) -> List[Row]:
+        """
+        Deletes localizations of the projects (ids or select of ids) with
+        their feedbacks, returns id, project_id, task_id, status,
+        duration_in_sec and priority of deleted ones
+        """
+        loc_ids = select(Localization.id).where(Localization.project_id.in_(prj_ids))
+        await self.db_session.execute(
+            delete(Feedback).where(Feedback.localization_id.in_(loc_ids))
+        )
+        query = (
+            delete(Localization)
+            .where(Localization.project_id.in_(prj_ids))
+            .returning(
+                Localization.id,
+                Localization.project_id,
+                Localization.task_id,
+                Localization.status,
+                Localization.duration_in_sec,
+                Localization.priority,
+            )
+        )
+        res = await self.db_session.execute(query)
+        await self.db_session.flush()
+        return res.fetchall()
+
     async def check_existance(self, loc_id: uuid.UUID) -> bool:
         query = select(Localization).where(Localization.id == loc_id)
         res = await self.db_session.execute(query)
         await self.db_session.flush()
         return bool(res.one_or_none())
     
-    async def get_list_created_before(self, before_date: datetime) -> List[Localization]:
-        query = select(Project).where((Project.status == StatusEnum.created) & (Project.created < before_date))
+    async def get_backlog_minutes(self) -> Dict[int, int]:
+        """
+        Minutes of video of not finished localizations by priority, ones of
+        failed projects wait for restart and are not counted
+        """
+        minutes = func.ceil(func.coalesce(Localization.duration_in_sec, 0) / 60)
+        query = (
+            select(Localization.priority, func.sum(minutes))
+            .join(Project, Project.id == Localization.project_id)
+            .where(
+                (Localization.status.in_((StatusEnum.created, StatusEnum.processing)))
+                & (Project.status != StatusEnum.failed)
+            )
+            .group_by(Localization.priority)
+        )
+        res = await self.db_session.execute(query)
+        return {priority: int(total) for priority, total in res.fetchall()}
+
+    async def fail_unfinished_by_project_id(self, prj_id: uuid.UUID) -> List[Row]:
+        """
+        Marks not finished localizations of the project as failed, returns
+        duration_in_sec and priority of them
+        """
+        query = (
+            update(Localization)
+            .where(
+                (Localization.project_id == prj_id)
+                & (Localization.status.in_((StatusEnum.created, StatusEnum.processing)))
+            )
+            .values(status=StatusEnum.failed, task_id=None, updated=datetime.utcnow())
+            .returning(Localization.duration_in_sec, Localization.priority)
+        )
         res = await self.db_session.execute(query)
         await self.db_session.flush()
-        return [r[0] for r in res.fetchall()]
+        return res.fetchall()
+
+    async def count_in_flight_by_user(self, usr_id: uuid.UUID) -> int:
+        query = (
+            select(func.count(Localization.id))
+            .join(Project, Project.id == Localization.project_id)
+            .where(
+                (Project.user_id == usr_id)
+                & (Localization.status.in_((StatusEnum.created, StatusEnum.processing)))
+            )
+        )
+        res = await self.db_session.execute(query)
+        return res.scalar_one()
+
+    async def get_owned(
+        self, loc_id: uuid.UUID, prj_id: uuid.UUID, usr_id: uuid.UUID
+    ) -> Union[Tuple[Localization, Project], None]:
+        """Localization with its project if both belong to the user"""
+        query = (
+            select(Localization, Project)
+            .join(Project, Project.id == Localization.project_id)
+            .where(
+                (Localization.id == loc_id)
+                & (Project.id == prj_id)
+                & (Project.user_id == usr_id)
+            )
+        )
+        res = await self.db_session.execute(query)
+        row = res.one_or_none()
+        return None if row is None else tuple(row)
 
     async def get_list_by_project_id(self, prj_id: uuid.UUID) -> List[Localization]:
         query = select(Localization).where(Localization.project_id == prj_id)
@@ -68,6 +159,23 @@ class LocalizationDAL:
 
         return [r[0] for r in res.fetchall()]
 
+    async def get_list_with_feedback(
+        self, prj_id: uuid.UUID, email: str
+    ) -> List[Tuple[Localization, Union[FeedbackEnum, None]]]:
+        """Localizations of the project with feedback status of the user"""
+        query = (
+            select(Localization, Feedback.status)
+            .outerjoin(
+                Feedback,
+                (Feedback.localization_id == Localization.id)
+                & (Feedback.user_email == email),
+            )
+            .where(Localization.project_id == prj_id)
+        )
+
+        res = await self.db_session.execute(query)
+        return [tuple(r) for r in res.fetchall()]
+
     async def get_list_by_user_id(
         self, usr_id: uuid.UUID, processed: bool
     ) -> List[Localization]:
@@ -97,12 +205,52 @@ class LocalizationDAL:
 
         return [r[0] for r in res.fetchall()]
 
+    async def get_result_names(self) -> List[Tuple[uuid.UUID, str]]:
+        query = select(Localization.project_id, Localization.result_name).where(
+            Localization.result_name.is_not(None)
+        )
+        res = await self.db_session.execute(query)
+        return [tuple(r) for r in res.fetchall()]
+
+    async def get_unfinished_ids(self) -> List[Tuple[uuid.UUID, uuid.UUID]]:
+        """Project and own ids of localizations which aren't processed yet or failed"""
+        query = select(Localization.project_id, Localization.id).where(
+            Localization.status.in_(
+                (StatusEnum.created, StatusEnum.processing, StatusEnum.failed)
+            )
+        )
+        res = await self.db_session.execute(query)
+        return [tuple(r) for r in res.fetchall()]
+
+    async def get_with_context(
+        self, loc_id: uuid.UUID
+    ) -> Tuple[Localization, Project, Language, User]:
+        query = (
+            select(Localization, Project, Language, User)
+            .join(Project, Project.id == Localization.project_id)
+            .join(Language, Language.id == Localization.target_language_id)
+            .join(User, User.id == Project.user_id)
+            .where(Localization.id == loc_id)
+        )
+        res = await self.db_session.execute(query)
+        return tuple(res.one())
+
     async def get_by_id(self, loc_id: uuid.UUID) -> Localization:
         query = select(Localization).where(Localization.id == loc_id)
         res = await self.db_session.execute(query)
         await self.db_session.flush()
         return res.fetchone()[0]
 
+    async def update(self, loc_id: uuid.UUID, **values) -> bool:
+        query = (
+            update(Localization)
+            .where(Localization.id == loc_id)
+            .values(**values, updated=datetime.utcnow())
+        )
+        await self.db_session.execute(query)
+        await self.db_session.flush()
+        return True
+
     async def update_task_id(self, loc_id: uuid.UUID, task_id: uuid.UUID) -> bool:
         query = (
             update(Localization)
@@ -113,6 +261,18 @@ class LocalizationDAL:
         await self.db_session.flush()
         return True
 
+    async def update_task_ids(self, task_ids: Dict[uuid.UUID, str]) -> bool:
+        now = datetime.utcnow()
+        await self.db_session.execute(
+            update(Localization),
+            [
+                {"id": loc_id, "task_id": task_id, "updated": now}
+                for loc_id, task_id in task_ids.items()
+            ],
+        )
+        await self.db_session.flush()
+        return True
+
     async def clear_task_id(self, loc_id: uuid.UUID) -> bool:
         query = (
             update(Localization)
@@ -160,10 +320,12 @@ class LocalizationDAL:
         return True
 
     async def update_speech_data(self, loc_id: uuid.UUID, speech_data) -> bool:
-        query = (
-            update(Localization)
-            .where(Localization.id == loc_id)
-            .values(parsed_speech_data=speech_data, updated=datetime.utcnow())
+        query = insert(LocalizationTranscript).values(
+            localization_id=loc_id, speech_data=speech_data
+        )
+        query = query.on_conflict_do_update(
+            index_elements=[LocalizationTranscript.localization_id],
+            set_={"speech_data": query.excluded.speech_data},
         )
 
         await self.db_session.execute(query)
@@ -171,6 +333,13 @@ class LocalizationDAL:
 
         return True
 
+    async def get_speech_data(self, loc_id: uuid.UUID) -> Union[list, None]:
+        query = select(LocalizationTranscript.speech_data).where(
+            LocalizationTranscript.localization_id == loc_id
+        )
+        res = await self.db_session.execute(query)
+        return res.scalar_one_or_none()
+
     async def update_status(self, loc_id: uuid.UUID, status) -> bool:
         query = (
             update(Localization)
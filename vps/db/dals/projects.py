@@ -1,13 +1,16 @@
 import uuid
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Tuple, Union
 
-from sqlalchemy import select
-from sqlalchemy import update, delete, and_
+from sqlalchemy import select, func
+from sqlalchemy import update, delete, and_, tuple_, exists
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql.expression import null
 
-from db.models import Project
+from db.models import Project, ProjectTranscript
+from core.config import Config
 from core.status import StatusEnum
 
 
@@ -26,6 +29,8 @@ class ProjectDAL:
         lang_id: uuid.UUID,
         duration: float = None,
         with_id: uuid.UUID = None,
+        source_hash: str = None,
+        priority: int = Config.DEFAULT_PRIORITY,
     ) -> Project:
         new_prj = Project(
             user_id=user_id,
@@ -33,6 +38,8 @@ class ProjectDAL:
             source_name=video_name,
             source_language_id=lang_id,
             preview_name=preview_name,
+            source_hash=source_hash,
+            priority=priority,
         )
         if duration:
             new_prj.duration_in_sec = duration
@@ -49,6 +56,26 @@ class ProjectDAL:
         await self.db_session.flush()
         return True
 
+    async def delete_by_user_id(self, usr_id: uuid.UUID) -> List[Row]:
+        """
+        Deletes user's projects, returns id, task_id, status, duration_in_sec
+        and priority of deleted ones
+        """
+        query = (
+            delete(Project)
+            .where(Project.user_id == usr_id)
+            .returning(
+                Project.id,
+                Project.task_id,
+                Project.status,
+                Project.duration_in_sec,
+                Project.priority,
+            )
+        )
+        res = await self.db_session.execute(query)
+        await self.db_session.flush()
+        return res.fetchall()
+
     async def check_existance(self, prj_id: uuid.UUID) -> bool:
         query = select(Project).where(Project.id == prj_id)
         res = await self.db_session.execute(query)
@@ -61,12 +88,47 @@ class ProjectDAL:
         await self.db_session.flush()
         return res.fetchone()[0]
     
-    async def get_list_created_before(self, before_date: datetime) -> List[Project]:
-        query = select(Project).where((Project.status == StatusEnum.created) & (Project.created < before_date))
+    async def get_transcribed_by_source_hash(
+        self, source_hash: str, lang_id: uuid.UUID
+    ) -> Union[Project, None]:
+        query = (
+            select(Project)
+            .where(
+                (Project.source_hash == source_hash)
+                & (Project.source_language_id == lang_id)
+                & exists().where(ProjectTranscript.project_id == Project.id)
+            )
+            .limit(1)
+        )
         res = await self.db_session.execute(query)
-        await self.db_session.flush()
+        row = res.fetchone()
+        return None if row is None else row[0]
 
-        return [r[0] for r in res.fetchall()]
+    async def get_backlog_minutes(self) -> Dict[int, int]:
+        """Minutes of video of not finished projects by priority"""
+        minutes = func.ceil(func.coalesce(Project.duration_in_sec, 0) / 60)
+        query = (
+            select(Project.priority, func.sum(minutes))
+            .where(Project.status.in_((StatusEnum.created, StatusEnum.processing)))
+            .group_by(Project.priority)
+        )
+        res = await self.db_session.execute(query)
+        return {priority: int(total) for priority, total in res.fetchall()}
+
+    async def get_file_names(self) -> List[Tuple[uuid.UUID, str, str, str]]:
+        query = select(
+            Project.id, Project.source_name, Project.preview_name, Project.source_hash
+        )
+        res = await self.db_session.execute(query)
+        return [tuple(r) for r in res.fetchall()]
+
+    async def count_in_flight_by_user(self, usr_id: uuid.UUID) -> int:
+        query = select(func.count(Project.id)).where(
+            (Project.user_id == usr_id)
+            & (Project.status.in_((StatusEnum.created, StatusEnum.processing)))
+        )
+        res = await self.db_session.execute(query)
+        return res.scalar_one()
 
     async def belongs_to_user(self, prj_id: uuid.UUID, usr_id: uuid.UUID) -> bool:
         query = select(Project).where(
@@ -78,6 +140,13 @@ class ProjectDAL:
             return False
         return True
 
+    async def get_owned(self, prj_id: uuid.UUID, usr_id: uuid.UUID) -> Union[Project, None]:
+        query = select(Project).where(
+            (Project.id == prj_id) & (Project.user_id == usr_id)
+        )
+        res = await self.db_session.execute(query)
+        return res.scalar_one_or_none()
+
     async def get_list_by_user_id(
         self, usr_id: uuid.UUID, processed: bool = False
     ) -> List[Project]:
@@ -94,6 +163,51 @@ class ProjectDAL:
 
         return [r[0] for r in res.fetchall()]
 
+    async def get_page_by_user_id(
+        self,
+        usr_id: uuid.UUID,
+        limit: int,
+        after: Union[Tuple[datetime, uuid.UUID], None] = None,
+        statuses: Union[List[StatusEnum], None] = None,
+    ) -> List[dict]:
+        """
+        Page of user's projects, newest first, after (created, id) of the last
+        project of the previous page. Only listed columns are loaded.
+        """
+        query = (
+            select(
+                Project.id,
+                Project.name,
+                Project.source_name,
+                Project.preview_name,
+                Project.duration_in_sec,
+                Project.created,
+                Project.updated,
+                Project.source_language_id,
+                Project.status,
+            )
+            .where(Project.user_id == usr_id)
+            .order_by(Project.created.desc(), Project.id.desc())
+            .limit(limit)
+        )
+        if after is not None:
+            query = query.where(tuple_(Project.created, Project.id) < tuple_(*after))
+        if statuses:
+            query = query.where(Project.status.in_(statuses))
+
+        res = await self.db_session.execute(query)
+        return [dict(r._mapping) for r in res.fetchall()]
+
+    async def update(self, prj_id: uuid.UUID, **values) -> bool:
+        query = (
+            update(Project)
+            .where(Project.id == prj_id)
+            .values(**values, updated=datetime.utcnow())
+        )
+        await self.db_session.execute(query)
+        await self.db_session.flush()
+        return True
+
     async def update_task_id(self, prj_id: uuid.UUID, task_id: uuid.UUID) -> bool:
         query = (
             update(Project)
@@ -139,10 +253,10 @@ class ProjectDAL:
         return True
 
     async def update_speech_data(self, prj_id: uuid.UUID, speech_data) -> bool:
-        query = (
-            update(Project)
-            .where(Project.id == prj_id)
-            .values(parsed_speech_data=speech_data, updated=datetime.utcnow())
+        query = insert(ProjectTranscript).values(project_id=prj_id, speech_data=speech_data)
+        query = query.on_conflict_do_update(
+            index_elements=[ProjectTranscript.project_id],
+            set_={"speech_data": query.excluded.speech_data},
         )
 
         await self.db_session.execute(query)
@@ -150,6 +264,13 @@ class ProjectDAL:
 
         return True
 
+    async def get_speech_data(self, prj_id: uuid.UUID) -> Union[list, None]:
+        query = select(ProjectTranscript.speech_data).where(
+            ProjectTranscript.project_id == prj_id
+        )
+        res = await self.db_session.execute(query)
+        return res.scalar_one_or_none()
+
     async def update_status(self, prj_id: uuid.UUID, status) -> bool:
         query = (
             update(Project)
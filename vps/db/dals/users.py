@@ -92,21 +92,33 @@ class UserDAL:
         return True
 
     async def update_balance(self, user_id: UUID, delta: int) -> bool:
-        current_balance = (await self.get_by_id(user_id)).balance
+        query = (
+            update(User)
+            .where((User.id == user_id) & (User.balance + delta >= 0))
+            .values(balance=User.balance + delta, updated=datetime.utcnow())
+        )
+
+        res = await self.db_session.execute(query)
+        await self.db_session.flush()
 
-        if (current_balance + delta) < 0:
-            return False
+        return res.rowcount > 0
 
+    async def debit_balance(self, user_id: UUID, amount: int) -> Union[int, None]:
+        """
+        Withdraws amount if the balance covers it, returns the new balance or
+        None. User's row stays locked until the end of the transaction.
+        """
         query = (
             update(User)
-            .where(User.id == user_id)
-            .values(balance=(current_balance + delta), updated=datetime.utcnow())
+            .where((User.id == user_id) & (User.balance >= amount))
+            .values(balance=User.balance - amount, updated=datetime.utcnow())
+            .returning(User.balance)
         )
 
-        await self.db_session.execute(query)
+        res = await self.db_session.execute(query)
         await self.db_session.flush()
 
-        return True
+        return res.scalar_one_or_none()
 
     async def get_by_id(self, user_id: UUID) -> Union[User, None]:
         query = select(User).where(User.id == user_id)
@@ -188,7 +200,7 @@ class UserDAL:
         await self.db_session.execute(query)
         await self.db_session.flush()
 
-        query = delete(User).where(User.user_id == user_id)
+        query = delete(User).where(User.id == user_id)
 
         await self.db_session.execute(query)
         await self.db_session.flush()
@@ -1,12 +1,13 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, Boolean, String, Integer, DateTime, Float
+from sqlalchemy import Column, Boolean, String, Integer, DateTime, Float, Index, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB, INTERVAL
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.sql.schema import ForeignKey
 from sqlalchemy_utils.types.choice import ChoiceType
 
+from core.config import Config
 from core.status import StatusEnum, SubscriptionTypeEnum, FeedbackEnum, StatEventTypeEnum
 
 Base = declarative_base()
@@ -97,18 +98,33 @@ class Project(Base):
     task_id = Column(String, nullable=True)
     name = Column(String, nullable=False)
     source_name = Column(String, nullable=False)
+    source_hash = Column(String, nullable=True, index=True)
     preview_name = Column(String, nullable=False)
     duration_in_sec = Column(Float, nullable=True)
     created = Column(DateTime, default=datetime.utcnow)
     updated = Column(DateTime, default=datetime.utcnow)
-    parsed_speech_data = Column(JSONB, nullable=True)
     source_language_id = Column(ForeignKey("languages.id"), nullable=True)
+    priority = Column(
+        Integer, nullable=False, default=Config.DEFAULT_PRIORITY, server_default=text("4")
+    )
     status = Column(
         ChoiceType(StatusEnum, impl=Integer()),
         nullable=False,
         default=StatusEnum.created,
     )
 
+    __table_args__ = (
+        # user's projects list, newest first
+        Index("ix_projects_user_id_created", "user_id", "created", "id"),
+        # queue backlog, not finished jobs are StatusEnum.created and processing
+        Index(
+            "ix_projects_pending",
+            "priority",
+            "created",
+            postgresql_where=text("status IN (1, 2)"),
+        ),
+    )
+
 
 class Language(Base):
     __tablename__ = "languages"
@@ -131,7 +147,9 @@ class Localization(Base):
     result_name = Column(String, nullable=True)
     duration_in_sec = Column(Float, nullable=True)
     estimated_completion_date = Column(DateTime, nullable=True)
-    parsed_speech_data = Column(JSONB, nullable=True)
+    priority = Column(
+        Integer, nullable=False, default=Config.DEFAULT_PRIORITY, server_default=text("4")
+    )
     created = Column(DateTime, default=datetime.utcnow)
     updated = Column(DateTime, default=datetime.utcnow)
     status = Column(
@@ -140,6 +158,34 @@ class Localization(Base):
         default=StatusEnum.created,
     )
 
+    __table_args__ = (
+        Index("ix_localizations_project_id_status", "project_id", "status"),
+        Index(
+            "ix_localizations_pending",
+            "priority",
+            "created",
+            postgresql_where=text("status IN (1, 2)"),
+        ),
+    )
+
+
+# Transcripts are kept apart from the hot tables, they are loaded by the
+# pipeline only
+class ProjectTranscript(Base):
+    __tablename__ = "project_transcripts"
+
+    project_id = Column(ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    speech_data = Column(JSONB, nullable=False)
+
+
+class LocalizationTranscript(Base):
+    __tablename__ = "localization_transcripts"
+
+    localization_id = Column(
+        ForeignKey("localizations.id", ondelete="CASCADE"), primary_key=True
+    )
+    speech_data = Column(JSONB, nullable=False)
+
 
 class Feedback(Base):
     __tablename__ = "feedbacks"
@@ -154,6 +200,9 @@ class Feedback(Base):
         default=FeedbackEnum.empty,
     )
 
+    # primary key starts with user_email, lookups by localization need their own
+    __table_args__ = (Index("ix_feedbacks_localization_id", "localization_id"),)
+
 
 class StatisticEvent(Base):
     __tablename__ = "statistic_events"
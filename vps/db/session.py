@@ -1,24 +1,72 @@
-import os
+import uuid
 from typing import Generator
 
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from core.config import Config
 
 
-engine = create_async_engine(
-    Config.POSTGRES_URL,
-    future=True,
-    echo=False,
-    pool_use_lifo=True,
-    pool_pre_ping=True,
-)
+def create_engine(profile: str) -> AsyncEngine:
+    """
+    API process serves many concurrent requests with one pool, every prefork
+    worker process runs one task at a time, so it keeps a small pool of its
+    own. Workers have no health check, so their connections are pinged on
+    checkout. Behind PgBouncer in transaction mode prepared statements can't
+    be reused, they are given unique names and are not cached.
+    """
+    if profile == "worker":
+        pool_size, max_overflow = Config.DB_WORKER_POOL_SIZE, Config.DB_WORKER_MAX_OVERFLOW
+        pre_ping = Config.DB_WORKER_PRE_PING
+    elif profile == "api":
+        pool_size, max_overflow = Config.DB_POOL_SIZE, Config.DB_MAX_OVERFLOW
+        pre_ping = Config.DB_PRE_PING
+    else:
+        raise ValueError(f"Unknown database profile '{profile}'")
+
+    connect_args = {"statement_cache_size": Config.DB_STATEMENT_CACHE_SIZE}
+    if Config.DB_PGBOUNCER:
+        connect_args = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+
+    return create_async_engine(
+        Config.POSTGRES_URL,
+        future=True,
+        echo=False,
+        pool_use_lifo=True,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=Config.DB_POOL_TIMEOUT_SEC,
+        pool_recycle=Config.DB_POOL_RECYCLE_SEC,
+        pool_pre_ping=pre_ping,
+        connect_args=connect_args,
+    )
+
+
+engine = create_engine(Config.DB_PROFILE)
 
 async_session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
 
+async def check_db() -> bool:
+    """
+    Health check of the API instead of pinging on every checkout, polled by
+    the compose healthcheck through /health: a dropped connection fails the
+    check and makes the pool invalidate its stale connections.
+    """
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        return False
+
+
 async def get_db() -> Generator:
     """Dependency for getting async session"""
     try:
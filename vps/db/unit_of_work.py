@@ -0,0 +1,62 @@
+import uuid
+from collections import defaultdict
+from typing import Dict
+
+from db.dals.projects import ProjectDAL
+from db.dals.localizations import LocalizationDAL
+from db.session import async_session
+
+
+class UnitOfWork:
+    """
+    Collects field updates of projects and localizations made by a task and
+    applies them in one transaction, one UPDATE statement per entity and one
+    upsert per transcript.
+    """
+
+    def __init__(self):
+        self._projects: Dict[uuid.UUID, dict] = defaultdict(dict)
+        self._localizations: Dict[uuid.UUID, dict] = defaultdict(dict)
+        self._project_speech_data: Dict[uuid.UUID, list] = {}
+        self._localization_speech_data: Dict[uuid.UUID, list] = {}
+
+    def update_project(self, prj_id: uuid.UUID, **values) -> None:
+        self._projects[prj_id].update(values)
+
+    def update_localization(self, loc_id: uuid.UUID, **values) -> None:
+        self._localizations[loc_id].update(values)
+
+    def update_project_speech_data(self, prj_id: uuid.UUID, speech_data: list) -> None:
+        self._project_speech_data[prj_id] = speech_data
+
+    def update_localization_speech_data(self, loc_id: uuid.UUID, speech_data: list) -> None:
+        self._localization_speech_data[loc_id] = speech_data
+
+    async def commit(self) -> bool:
+        if not (
+            self._projects
+            or self._localizations
+            or self._project_speech_data
+            or self._localization_speech_data
+        ):
+            return False
+
+        session = async_session()
+        async with session.begin():
+            project_dal = ProjectDAL(session)
+            for prj_id, speech_data in self._project_speech_data.items():
+                await project_dal.update_speech_data(prj_id, speech_data)
+            for prj_id, values in self._projects.items():
+                await project_dal.update(prj_id, **values)
+            localization_dal = LocalizationDAL(session)
+            for loc_id, speech_data in self._localization_speech_data.items():
+                await localization_dal.update_speech_data(loc_id, speech_data)
+            for loc_id, values in self._localizations.items():
+                await localization_dal.update(loc_id, **values)
+        await session.close()
+
+        self._projects.clear()
+        self._localizations.clear()
+        self._project_speech_data.clear()
+        self._localization_speech_data.clear()
+        return True
@@ -5,9 +5,10 @@ from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 
 from api.middlewares import add_middlewares
-from api.routers import users_router, projects_router, payments_router, languages_router, share_router
+from api.routers import users_router, projects_router, payments_router, languages_router, share_router, media_router
 from core.admin import init_admin
 from core.config import Config
+from db.session import check_db
 
 if Config.DEBUG:
     app = FastAPI(title="vpsDub", version="1.0.0")
@@ -20,6 +21,7 @@ app.include_router(projects_router, prefix="/projects")
 app.include_router(payments_router, prefix="/payments")
 app.include_router(languages_router, prefix="/languages")
 app.include_router(share_router, prefix="/share")
+app.include_router(media_router, prefix="/media")
 
 FORMAT = "%(asctime)s | %(name)s | %(levelname)s | %(message)s"
 
@@ -34,6 +36,15 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     )
 
 
+@app.get("/health", include_in_schema=False)
+async def health():
+    if await check_db():
+        return JSONResponse(status_code=status.HTTP_200_OK, content="ok")
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content="database unavailable"
+    )
+
+
 @app.on_event("startup")
 async def startup():
     logging.basicConfig(format=FORMAT, level=logging.INFO)
@@ -0,0 +1,37 @@
+import pytest
+
+media = pytest.importorskip("api.routers.media")
+
+
+class RequestStandIn:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=10-", (10, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=20-10", None),
+    ("bytes=a-10", None),
+    ("items=0-10", None),
+    ("bytes=-", None),
+])
+def test_parse_range(header, expected):
+    assert media._parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=-0"])
+def test_parse_range_not_satisfiable(header):
+    with pytest.raises(ValueError):
+        media._parse_range(header, 1000)
+
+
+def test_not_modified_by_etag():
+    etag = '"abc"'
+    assert media._not_modified(RequestStandIn({"if-none-match": '"xyz", "abc"'}), etag, 0)
+    assert media._not_modified(RequestStandIn({"if-none-match": 'W/"abc"'}), etag, 0)
+    assert not media._not_modified(RequestStandIn({"if-none-match": '"xyz"'}), etag, 0)
+    assert not media._not_modified(RequestStandIn({}), etag, 0)
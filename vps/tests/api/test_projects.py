@@ -0,0 +1,33 @@
+import base64
+import uuid
+from datetime import datetime
+
+import pytest
+
+projects = pytest.importorskip("api.actions.projects")
+exceptions = pytest.importorskip("api.exceptions")
+
+
+def b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def test_cursor_round_trip():
+    created, prj_id = datetime(2026, 10, 19, 12, 30, 5, 123456), uuid.uuid4()
+
+    assert projects.decode_cursor(projects.encode_cursor(created, prj_id)) == (created, prj_id)
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not a cursor",
+    b64(b"2026-10-19T12:30:05"),
+    b64(f"yesterday|{uuid.uuid4()}".encode()),
+    b64(b"2026-10-19T12:30:05|not-uuid"),
+    b64(f"2026-10-19T12:30:05|{uuid.uuid4()}|extra".encode()),
+    b64(b"\xff\xfe"),
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(Exception) as e:
+        projects.decode_cursor(cursor)
+    assert e.value is exceptions.incorrectCursor_exception
@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+requests = pytest.importorskip("requests")
+error = pytest.importorskip("elevenlabs.api.error")
+services = pytest.importorskip("api.services")
+
+
+def http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.HTTPError(response=response)
+
+
+def synt_error_raised_by(status_code):
+    try:
+        raise http_error(status_code)
+    except requests.HTTPError:
+        try:
+            raise error.APIError("Unknown error", None)
+        except error.APIError as e:
+            return e
+
+
+@pytest.mark.parametrize("e, transient", [
+    (asyncio.TimeoutError(), True),
+    (aiohttp.ClientConnectionError(), True),
+    (aiohttp.ClientResponseError(None, (), status=503), True),
+    (aiohttp.ClientResponseError(None, (), status=429), True),
+    (aiohttp.ClientResponseError(None, (), status=400), False),
+    (requests.Timeout(), True),
+    (requests.ConnectionError(), True),
+    (http_error(502), True),
+    (http_error(404), False),
+    (error.RateLimitError("Too many requests", "too_many_concurrent_requests"), True),
+    (error.APIError("Busy", "system_busy"), True),
+    (error.APIError("Out of credits", "quota_exceeded"), False),
+    (error.APIError("No voice", "voice_not_found"), False),
+    (synt_error_raised_by(500), True),
+    (ValueError(), False),
+])
+def test_is_transient(e, transient):
+    assert services._is_transient(e) is transient
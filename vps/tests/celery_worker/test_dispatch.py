@@ -0,0 +1,108 @@
+import asyncio
+import uuid
+
+import pytest
+
+dispatch_module = pytest.importorskip("celery_worker.dispatch")
+
+
+class PipelineStandIn:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.calls.clear()
+
+    def set(self, *args, **kwargs):
+        self.calls.append(self.client.set(*args, **kwargs))
+
+    async def execute(self):
+        return [await call for call in self.calls]
+
+
+class RedisStandIn:
+    def __init__(self):
+        self.values = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return PipelineStandIn(self)
+
+
+class SignatureStandIn:
+    def __init__(self, fail=False):
+        self.id = str(uuid.uuid4())
+        self.fail = fail
+        self.sent = 0
+
+    def freeze(self):
+        return self
+
+    def apply_async(self):
+        if self.fail:
+            raise ConnectionError("Broker is down")
+        self.sent += 1
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = RedisStandIn()
+    monkeypatch.setattr(dispatch_module, "redis_client", client)
+    return client
+
+
+def test_dispatch_locks_until_release(client):
+    loc_id = uuid.uuid4()
+    sig = SignatureStandIn()
+
+    assert asyncio.run(dispatch_module.dispatch("localization", loc_id, sig)) == (sig.id, True)
+    assert sig.sent == 1
+    assert client.values[dispatch_module.lock_key("localization", loc_id)] == sig.id
+
+    asyncio.run(dispatch_module.release("localization", loc_id))
+    assert not client.values
+
+
+def test_duplicate_dispatch_returns_task_in_flight(client):
+    loc_id = uuid.uuid4()
+    first, second = SignatureStandIn(), SignatureStandIn()
+
+    asyncio.run(dispatch_module.dispatch("localization", loc_id, first))
+    task_id, sent = asyncio.run(dispatch_module.dispatch("localization", loc_id, second))
+
+    assert (task_id, sent) == (first.id, False)
+    assert second.sent == 0, "Duplicate task should not be sent"
+
+
+def test_failed_send_releases_lock(client):
+    with pytest.raises(ConnectionError):
+        asyncio.run(dispatch_module.dispatch("project", uuid.uuid4(), SignatureStandIn(fail=True)))
+    assert not client.values
+
+
+def test_acquire_many_skips_locked(client):
+    locked, free = uuid.uuid4(), uuid.uuid4()
+    asyncio.run(dispatch_module.acquire("localization", locked, "in-flight"))
+
+    acquired = asyncio.run(dispatch_module.acquire_many(
+        "localization", {locked: "new-1", free: "new-2"}
+    ))
+
+    assert acquired == {free: "new-2"}
+    assert client.values[dispatch_module.lock_key("localization", locked)] == "in-flight"
@@ -0,0 +1,99 @@
+import asyncio
+from collections import defaultdict
+
+import pytest
+
+eta_module = pytest.importorskip("celery_worker.eta")
+EtaEngine = eta_module.EtaEngine
+
+
+class PipelineStandIn:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.calls.clear()
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            self.calls.append(getattr(self.client, name)(*args, **kwargs))
+        return call
+
+    async def execute(self):
+        return [await call for call in self.calls]
+
+
+class RedisStandIn:
+    def __init__(self):
+        self.hashes = defaultdict(dict)
+
+    async def hincrby(self, key, field, amount):
+        value = int(self.hashes[key].get(str(field), 0)) + amount
+        self.hashes[key][str(field)] = str(value)
+
+    async def hget(self, key, field):
+        return self.hashes[key].get(str(field))
+
+    async def hgetall(self, key):
+        return dict(self.hashes[key])
+
+    async def hset(self, key, field=None, value=None, mapping=None):
+        if field is not None:
+            self.hashes[key][str(field)] = str(value)
+        for field, value in (mapping or {}).items():
+            self.hashes[key][str(field)] = str(value)
+
+    async def delete(self, key):
+        self.hashes.pop(key, None)
+
+    async def expire(self, key, seconds):
+        pass
+
+    def pipeline(self, transaction=True):
+        return PipelineStandIn(self)
+
+
+def test_enqueue_and_dequeue_backlog():
+    client = RedisStandIn()
+    engine = EtaEngine(client)
+
+    async def run():
+        await engine.enqueue("localization", 5, 1)
+        await engine.enqueue_many("localization", [(3, 1), (10, 4)])
+        await engine.dequeue("localization", 2, 1)
+        await engine.dequeue_many("localization", [(10, 4)])
+
+    asyncio.run(run())
+    assert client.hashes["eta:backlog:localization"] == {"1": "6", "4": "0"}
+
+    asyncio.run(engine.reset_backlog("localization", {2: 7}))
+    assert client.hashes["eta:backlog:localization"] == {"2": "7"}
+
+
+def test_estimate_counts_jobs_ahead():
+    client = RedisStandIn()
+    client.hashes["eta:rate"] = {
+        "transcribe": "2", "translate": "1", "synthesize": "3", "mix": "1", "merge": "1",
+    }
+    client.hashes["eta:capacity"] = {"celery": "1", "synthesize": "3"}
+    client.hashes["eta:backlog:localization"] = {"1": "10", "5": "20", "9": "100"}
+    client.hashes["eta:backlog:project"] = {"5": "4", "7": "10"}
+    engine = EtaEngine(client)
+
+    # own stages 2 * 6, 30 minutes ahead drained at the slowest pace of 1
+    assert asyncio.run(engine.estimate(2, 5, transcribe=False)) == 42
+    # plus own transcription 2 * 2 and 4 minutes of projects ahead at 2
+    assert asyncio.run(engine.estimate(2, 5, transcribe=True)) == 54
+
+
+def test_estimate_ignores_negative_backlog():
+    client = RedisStandIn()
+    client.hashes["eta:rate"] = {"translate": "1", "synthesize": "1", "mix": "1", "merge": "1"}
+    client.hashes["eta:backlog:localization"] = {"1": "-10"}
+    engine = EtaEngine(client)
+
+    assert asyncio.run(engine.estimate(1, 5, transcribe=False)) == 4
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+pydantic = pytest.importorskip("pydantic")
+auth_cache_module = pytest.importorskip("core.auth_cache")
+AuthCache = auth_cache_module.AuthCache
+
+
+class UserStandIn(pydantic.BaseModel):
+    email: str
+    balance: int = 0
+
+
+class BrokenRedis:
+    async def get(self, key):
+        raise ConnectionError("Redis is down")
+
+    async def set(self, key, value, px=None):
+        raise ConnectionError("Redis is down")
+
+    async def delete(self, key):
+        raise ConnectionError("Redis is down")
+
+
+def test_auth_cache_entries_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(auth_cache_module.time, "monotonic", lambda: now[0])
+    cache = AuthCache(UserStandIn, ttl=5, max_size=10)
+    user = UserStandIn(email="a@mail.com")
+
+    asyncio.run(cache.set("token", user.email, user))
+    assert asyncio.run(cache.get("token", user.email)) == user
+    assert asyncio.run(cache.get("token", "other@mail.com")) is None
+
+    now[0] += 6
+    assert asyncio.run(cache.get("token", user.email)) is None
+
+
+def test_auth_cache_is_bounded():
+    cache = AuthCache(UserStandIn, ttl=60, max_size=2)
+    for i in range(3):
+        user = UserStandIn(email=f"{i}@mail.com")
+        asyncio.run(cache.set(f"token{i}", user.email, user))
+
+    assert asyncio.run(cache.get("token0", "0@mail.com")) is None, "Oldest entry should be evicted"
+    assert asyncio.run(cache.get("token2", "2@mail.com")) is not None
+
+
+def test_auth_cache_invalidates_all_tokens_of_user():
+    cache = AuthCache(UserStandIn, ttl=60, max_size=10)
+    user, other = UserStandIn(email="a@mail.com"), UserStandIn(email="b@mail.com")
+    asyncio.run(cache.set("web", user.email, user))
+    asyncio.run(cache.set("mobile", user.email, user))
+    asyncio.run(cache.set("other", other.email, other))
+
+    asyncio.run(cache.invalidate(user.email))
+
+    assert asyncio.run(cache.get("web", user.email)) is None
+    assert asyncio.run(cache.get("mobile", user.email)) is None
+    assert asyncio.run(cache.get("other", other.email)) == other
+
+
+def test_auth_cache_survives_redis_errors():
+    cache = AuthCache(UserStandIn, ttl=60, max_size=10, client=BrokenRedis())
+    user = UserStandIn(email="a@mail.com")
+
+    asyncio.run(cache.set("token", user.email, user))
+    assert asyncio.run(cache.get("token", user.email)) is None
+    asyncio.run(cache.invalidate(user.email))
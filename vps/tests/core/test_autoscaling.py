@@ -0,0 +1,39 @@
+from collections import defaultdict
+
+from core.autoscaling import QueueStats, target_concurrency
+
+
+class RedisStandIn:
+    def __init__(self):
+        self.lists = defaultdict(list)
+        self.hashes = defaultdict(dict)
+
+    def llen(self, key):
+        return len(self.lists[key])
+
+    def hget(self, key, field):
+        return self.hashes[key].get(field)
+
+    def hset(self, key, field, value):
+        self.hashes[key][field] = str(value)
+
+
+def test_queue_stats_depth_and_duration():
+    client = RedisStandIn()
+    client.lists["mix"] = ["task"] * 2
+    client.lists["mix:3"] = ["task"] * 5
+    client.lists["merge"] = ["task"]
+    stats = QueueStats(client, priority_steps=range(10), alpha=0.5)
+
+    assert stats.depth("mix") == 7
+    assert stats.duration("mix") is None
+
+    stats.record("mix", 10)
+    stats.record("mix", 20)
+    assert stats.duration("mix") == 15
+
+
+def test_target_concurrency_bounds():
+    assert target_concurrency(0, 0, 60, 1, 8) == 1
+    assert target_concurrency(150, 2, 60, 1, 8) == 5
+    assert target_concurrency(6000, 2, 60, 1, 8) == 8
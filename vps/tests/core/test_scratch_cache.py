@@ -0,0 +1,60 @@
+import os
+import threading
+
+from core.scratch_cache import ScratchCache
+
+
+def test_scratch_cache_fills_once(tmp_path):
+    cache = ScratchCache(str(tmp_path), max_bytes=1024)
+    calls = []
+
+    def fill(path):
+        calls.append(path)
+        with open(path, "wb") as f:
+            f.write(b"video")
+
+    threads = [
+        threading.Thread(target=cache.fetch, args=("prj/source.mp4", fill))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    path = cache.path("prj/source.mp4")
+    assert len(calls) == 1, f"File was filled {len(calls)} times instead of once"
+    with open(path, "rb") as f:
+        assert f.read() == b"video"
+
+
+def test_scratch_cache_evicts_least_recently_used(tmp_path):
+    cache = ScratchCache(str(tmp_path), max_bytes=25, low_watermark=1.0, min_age=0)
+
+    def fill(path):
+        with open(path, "wb") as f:
+            f.write(b"x" * 10)
+
+    for i in range(3):
+        cache.fetch(f"prj/{i}.mp4", fill)
+        os.utime(cache.path(f"prj/{i}.mp4"), (i, i))
+
+    cache.evict()
+
+    assert not os.path.exists(cache.path("prj/0.mp4")), "Oldest entry wasn't evicted"
+    assert not os.path.exists(cache.path("prj/0.mp4") + cache.lock_suffix)
+    assert os.path.exists(cache.path("prj/1.mp4"))
+    assert os.path.exists(cache.path("prj/2.mp4"))
+
+
+def test_scratch_cache_store_replaces_entry(tmp_path):
+    cache = ScratchCache(str(tmp_path / "cache"), max_bytes=1024)
+    cache.fetch("prj/mix.wav", lambda path: open(path, "wb").close())
+
+    new_path = tmp_path / "mix.wav"
+    new_path.write_bytes(b"remixed")
+    path = cache.store("prj/mix.wav", str(new_path))
+
+    assert not new_path.exists(), "Stored file should be moved into the cache"
+    with open(path, "rb") as f:
+        assert f.read() == b"remixed"
@@ -17,3 +17,10 @@ def test_access_token():
             assert (
                 aim == aim_decoded
             ), f"Aim ({aim}) and decoded aim ({aim_decoded}) are not equal"
+
+
+def test_media_token_is_stable():
+    from core.security import create_media_token
+
+    assert create_media_token("prj") == create_media_token("prj")
+    assert create_media_token("prj") != create_media_token("other")
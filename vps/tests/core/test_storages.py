@@ -0,0 +1,21 @@
+import os
+
+import pytest
+
+storages = pytest.importorskip("core.storages")
+
+
+def test_collect_garbage_keeps_referenced_and_checkpoints(tmp_path, monkeypatch):
+    monkeypatch.setattr(storages, "ROOT", str(tmp_path))
+    monkeypatch.setattr(storages, "backend", storages.LocalStorage(str(tmp_path)))
+    prj_dir = tmp_path / "prj"
+    prj_dir.mkdir()
+    for name in ["source.mp4", "frag_loc_0.mp3", "mix_loc.wav", "mix_loc.wav.1.part",
+                 "frag_done_0.mp3", "stale.wav"]:
+        (prj_dir / name).write_bytes(b"data")
+        os.utime(prj_dir / name, (0, 0))
+
+    reclaimed = storages.collect_garbage({"prj": {"source.mp4", "loc"}}, max_age=60)
+
+    assert sorted(os.listdir(prj_dir)) == ["frag_loc_0.mp3", "mix_loc.wav", "source.mp4"]
+    assert reclaimed == 12
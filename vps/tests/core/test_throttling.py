@@ -0,0 +1,50 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+
+from core.throttling import CircuitBreaker, CircuitOpenError, TokenBucket
+
+
+def test_circuit_breaker_opens_and_probes():
+    breaker = CircuitBreaker(threshold=2, reset_timeout=0, max_wait=5)
+
+    breaker.failure()
+    assert not breaker.is_open
+    breaker.failure()
+    assert breaker.is_open
+
+    assert asyncio.run(breaker.wait()) == 0
+    assert breaker.probing, "Probe call should be let through after timeout"
+
+    breaker.success()
+    assert not breaker.is_open and breaker.failures == 0
+
+
+def test_circuit_breaker_wait_is_limited():
+    breaker = CircuitBreaker(threshold=1, reset_timeout=60, max_wait=0)
+    breaker.failure()
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(breaker.wait())
+
+
+def test_token_bucket_reserves_tokens():
+    aioredis = pytest.importorskip("redis.asyncio")
+    url = os.environ.get("TEST_REDIS_URL")
+    if not url:
+        pytest.skip("TEST_REDIS_URL is not set")
+
+    async def acquire_all():
+        client = aioredis.Redis.from_url(url, decode_responses=True)
+        bucket = TokenBucket(client, f"test:{uuid.uuid4()}", rate=10, burst=2)
+        try:
+            return [await bucket.acquire() for _ in range(3)]
+        finally:
+            await client.delete(bucket.key)
+            await client.aclose()
+
+    first, second, third = asyncio.run(acquire_all())
+    assert first == second == 0, "Burst tokens should be taken without waiting"
+    assert 0 < third <= 0.1, f"Third call should wait for one token, waited {third}"